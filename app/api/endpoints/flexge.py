@@ -1,11 +1,20 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional
-from app.services.flexge_service import FlexgeService
+from app.services.flexge_service import (
+    FlexgeService,
+    flexge_index,
+    classificar_inatividade,
+    aplicar_acao_em_lotes,
+)
 from app.services.whatsapp_service import WhatsAppService
 from app.services.email_service import EmailService
 from app.core.config import settings
 import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 flexge_service = FlexgeService()
@@ -27,8 +36,9 @@ async def explicacao_gramatica(request_data: EmailRequest):
             return {"resposta": "🌟 Nenhum erro recente!", "status": "sucesso"}
 
         resposta = "📊 *Análise Flexge* 📊\n\n"
-        for erro in sorted(erros, key=lambda x: x["errorPercentage"], reverse=True)[:3]:
-            explicacao = await flexge_service.gerar_resposta_gpt(erro["name"])
+        principais = sorted(erros, key=lambda x: x["errorPercentage"], reverse=True)[:3]
+        explicacoes = await flexge_service.gerar_respostas_gpt([erro["name"] for erro in principais])
+        for erro, explicacao in zip(principais, explicacoes):
             resposta += f"📌 **{erro['name']} ({erro['errorPercentage']}%)**\n{explicacao}\n-------------------------\n"
 
         return {"resposta": resposta.strip(), "status": "sucesso"}
@@ -49,8 +59,9 @@ async def mastery_test(request_data: EmailRequest):
             return {"resposta": "🌟 Nenhum teste recente encontrado!", "status": "sucesso"}
 
         resposta = "📝 *Análise dos Mastery Tests* 📝\n\n"
-        for teste in resultados[:3]:  # Últimos 3 testes
-            explicacao = await flexge_service.gerar_resposta_gpt(f"Mastery Test {teste['level']}")
+        testes = resultados[:3]  # Últimos 3 testes
+        explicacoes = await flexge_service.gerar_respostas_gpt([f"Mastery Test {teste['level']}" for teste in testes])
+        for teste, explicacao in zip(testes, explicacoes):
             resposta += f"📌 **Nível {teste['level']} - {teste['score']}%**\n"
             resposta += f"Tópicos: {teste['topics']}\n"
             resposta += f"Dicas: {explicacao}\n-------------------------\n"
@@ -67,11 +78,10 @@ async def habilitar_aluno(request_data: EmailRequest):
         if not aluno:
             raise HTTPException(status_code=404, detail="Aluno não encontrado")
         
-        resp = await flexge_service.patch_student_action(aluno["id"], "enable")
-        if resp.status_code == 200:
+        if await flexge_service.patch_student_action(aluno["id"], "enable"):
             return {"status": "Aluno habilitado com sucesso"}
         
-        raise HTTPException(status_code=400, detail=resp.text)
+        raise HTTPException(status_code=400, detail="Flexge não aplicou a ação")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -83,11 +93,10 @@ async def desabilitar_aluno(request_data: EmailRequest):
         if not aluno:
             raise HTTPException(status_code=404, detail="Aluno não encontrado")
         
-        resp = await flexge_service.patch_student_action(aluno["id"], "disable")
-        if resp.status_code == 200:
+        if await flexge_service.patch_student_action(aluno["id"], "disable"):
             return {"status": "Aluno desabilitado com sucesso"}
         
-        raise HTTPException(status_code=400, detail=resp.text)
+        raise HTTPException(status_code=400, detail="Flexge não aplicou a ação")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -95,39 +104,54 @@ async def desabilitar_aluno(request_data: EmailRequest):
 @router.get("/check-inatividade")
 async def check_inatividade(background_tasks: BackgroundTasks):
     try:
-        page = 1
-        bloqueados = 0
-        avisados = 0
-        hoje = datetime.datetime.utcnow()
+        inicio = time.monotonic()
+        
+        # Roster completo, com as páginas buscadas em paralelo pelo índice.
+        # Só bloqueia com base numa passada completa feita agora: dados
+        # antigos ou parciais podem ter lastAccess desatualizado.
+        completa, _ = await flexge_index.atualizar()
+        if not completa:
+            raise HTTPException(status_code=502, detail="Não foi possível carregar todos os alunos do Flexge")
+        alunos = flexge_index.alunos()
+        fim_busca = time.monotonic()
+        
+        bloquear, avisar = classificar_inatividade(alunos, datetime.datetime.now(datetime.timezone.utc))
+        fim_classificacao = time.monotonic()
         
-        while True:
-            dados = await flexge_service.get_students(page)
-            if not dados or not dados.get("docs"):
-                break
-            
-            for aluno in dados["docs"]:
-                last_access = aluno.get("lastAccess")
-                if not last_access:
-                    continue
-                
-                dias_inativo = (hoje - datetime.datetime.fromisoformat(last_access.replace("Z", "+00:00"))).days
-                
-                if dias_inativo >= 10:
-                    # Desabilitar aluno
-                    await flexge_service.patch_student_action(aluno["id"], "disable")
-                    bloqueados += 1
-                elif dias_inativo >= 8:
-                    # Enviar email de aviso
-                    background_tasks.add_task(
-                        email_service.send_inactivity_email,
-                        aluno["email"],
-                        aluno["name"].split()[0]
-                    )
-                    avisados += 1
-            
-            page += 1
+        # Desabilitar alunos em lotes (um PATCH por lote)
+        desabilitados, falhas = await aplicar_acao_em_lotes([aluno.id for aluno in bloquear], "disable")
+        ids_desabilitados = set(desabilitados)
+        for aluno in bloquear:
+            if aluno.id in ids_desabilitados:
+                aluno.enabled = False
+        fim_bloqueio = time.monotonic()
         
-        return {"bloqueados": bloqueados, "avisados": avisados}
+        # Enviar emails de aviso (um único job; o pool SMTP agrupa em lotes)
+        destinatarios = []
+        for aluno in avisar:
+            if not aluno.email:
+                continue
+            nomes = (aluno.name or "").split()
+            destinatarios.append((aluno.email, nomes[0] if nomes else ""))
+        if destinatarios:
+            background_tasks.add_task(email_service.send_inactivity_emails, destinatarios)
+        
+        relatorio = {
+            "bloqueados": len(desabilitados),
+            "avisados": len(destinatarios),
+            "falhas_bloqueio": len(falhas),
+            "alunos_analisados": len(alunos),
+            "tempos": {
+                "busca": round(fim_busca - inicio, 3),
+                "classificacao": round(fim_classificacao - fim_busca, 3),
+                "bloqueio": round(fim_bloqueio - fim_classificacao, 3),
+                "total": round(time.monotonic() - inicio, 3),
+            },
+        }
+        logger.info(f"Varredura de inatividade concluída: {relatorio}")
+        return relatorio
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
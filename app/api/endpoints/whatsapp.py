@@ -1,19 +1,26 @@
 from fastapi import APIRouter, HTTPException, Request
 from app.services.whatsapp_service import WhatsAppService
 from app.services.flexge_service import FlexgeService
-from app.services.elevenlabs_service import text_to_speech
-from app.core.config import settings
+from app.services.notion_service import NotionService
+from app.services.webhook_queue import webhook_queue
+from app.services.message_coalescer import message_coalescer
+from app.services.message_dedup import message_dedup
+from app.services.tts_cache import tts_cache
+from app.services.zapi_dispatcher import zapi_dispatcher
+from app.core.circuit_breaker import circuitos
+from app.core.smtp_pool import smtp_pool
+from app.core.media_store import media_store
+from app.core.logs import resumo
 from typing import Optional
 from pydantic import BaseModel
 import json
 import logging
 from datetime import datetime
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
+whatsapp_service = WhatsAppService()
 
 class WhatsAppAssociationRequest(BaseModel):
     phone: str
@@ -27,7 +34,6 @@ async def associate_whatsapp(request: WhatsAppAssociationRequest):
     Requer código de verificação enviado por email
     """
     flexge_service = FlexgeService()
-    whatsapp_service = WhatsAppService()
     
     try:
         # TODO: Implementar verificação do código enviado por email
@@ -42,6 +48,7 @@ async def associate_whatsapp(request: WhatsAppAssociationRequest):
         
         # TODO: Atualizar o número de WhatsApp no Notion
         # Esta funcionalidade deve ser implementada no NotionService
+        NotionService.invalidar_cache_aluno(phone=request.phone, email=request.email)
         
         # Enviar mensagem de confirmação
         await whatsapp_service.enviar_mensagem_texto(
@@ -58,11 +65,12 @@ async def associate_whatsapp(request: WhatsAppAssociationRequest):
 @router.post("/webhook")
 async def zapi_webhook(request: Request):
     """
-    Endpoint para receber webhooks do Z-API
+    Endpoint para receber webhooks do Z-API.
+    Valida, enfileira e responde na hora; o processamento roda na fila.
     """
     try:
         webhook_data = await request.json()
-        logger.info(f"Webhook recebido: {webhook_data}")
+        logger.info("Webhook recebido: %s", resumo(webhook_data))
 
         # Ignorar mensagens de grupo
         if webhook_data.get("isGroup") or "group" in str(webhook_data.get("phone", "")):
@@ -75,58 +83,33 @@ async def zapi_webhook(request: Request):
             webhook_data["type"] = "message"
             if isinstance(webhook_data.get("text"), dict):
                 webhook_data["text"] = webhook_data["text"].get("message", "")
-            logger.info(f"Mensagem normalizada: {webhook_data}")
+            logger.debug("Mensagem normalizada: %s", resumo(webhook_data))
         
         # Verificar se é um tipo de mensagem suportado
         if webhook_data.get("type") not in ["message", "audio", "image", "document"]:
             logger.info(f"Tipo de mensagem não suportado: {webhook_data.get('type')}")
             return {"status": "ignored"}
         
-        # Processar mensagem
-        service = WhatsAppService()
-        resultado = await service.processar_webhook(webhook_data)
+        # Descartar retries do Z-API já processados ou em processamento
+        message_id = webhook_data.get("messageId")
+        if not await message_dedup.iniciar(message_id):
+            return {"status": "duplicate"}
         
-        if resultado.get("error"):
-            logger.error(f"Erro no processamento do webhook: {resultado['error']}")
-            if resultado["error"] == "Aluno não encontrado":
-                # Enviar mensagem educada informando que não foi encontrado
-                await service.enviar_mensagem_texto(
-                    webhook_data.get("phone"),
-                    "Olá! Não consegui encontrar seu cadastro. Por favor, verifique se seu número está registrado corretamente no sistema."
-                )
-            raise HTTPException(status_code=400, detail=resultado["error"])
-        
-        # Processar a mensagem com a Zaia
-        logger.info(f"Processando mensagem com Zaia: {resultado}")
-        resposta, usar_audio = await service.process_with_zaia(
-            resultado.get("message", ""),
-            resultado.get("aluno"),
-            resultado.get("contexto"),
-            resultado.get("phone", webhook_data.get("phone"))
-        )
-        logger.info(f"Resposta da Zaia: {resposta}, usar_audio: {usar_audio}")
-        
-        # Enviar resposta
-        if usar_audio or resultado.get("type") == "audio":
-            if settings.ELEVENLABS_API_KEY:
-                try:
-                    # Converter texto em áudio
-                    audio_data = await text_to_speech(resposta)
-                    if audio_data:
-                        await service.enviar_audio(webhook_data.get("phone"), audio_data)
-                    else:
-                        await service.enviar_mensagem_texto(webhook_data.get("phone"), resposta)
-                except Exception as e:
-                    logger.error(f"Erro ao processar áudio: {str(e)}")
-                    await service.enviar_mensagem_texto(webhook_data.get("phone"), resposta)
-            else:
-                await service.enviar_mensagem_texto(webhook_data.get("phone"), resposta)
-        else:
-            logger.info(f"Enviando resposta como texto para {webhook_data.get('phone')}")
-            await service.enviar_mensagem_texto(webhook_data.get("phone"), resposta)
+        # Enfileirar o processamento e responder imediatamente ao Z-API
+        if not webhook_queue.enfileirar(
+            webhook_data.get("phone", ""),
+            lambda: message_dedup.executar(
+                message_id,
+                lambda: whatsapp_service.processar_mensagem_recebida(webhook_data)
+            )
+        ):
+            await message_dedup.liberar(message_id)
+            raise HTTPException(status_code=503, detail="Fila de processamento cheia")
         
-        return {"status": "success", "message": "Mensagem processada com sucesso"}
+        return {"status": "queued", "message": "Mensagem recebida para processamento"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro no webhook: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -137,6 +120,15 @@ async def check_status():
     Endpoint para verificar status da conexão com WhatsApp
     """
     try:
-        return {"status": "connected"}
+        return {
+            "status": "connected",
+            "fila": webhook_queue.metricas(),
+            "agrupamento": message_coalescer.metricas(),
+            "envio_zapi": zapi_dispatcher.metricas(),
+            "email": smtp_pool.metricas(),
+            "circuitos": circuitos.estados(),
+            "cache_audio": tts_cache.metricas(),
+            "midia": media_store.metricas()
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -5,4 +5,4 @@ router = APIRouter()
 
 @router.get("/mastery-test/{numero}")
 async def mastery_test(numero: str):
-    return processar_mastery_test(numero) 
\ No newline at end of file
+    return await processar_mastery_test(numero) 
\ No newline at end of file
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.core.media_store import media_store, TIPOS_MIDIA
+
+router = APIRouter()
+
+@router.get("/{nome}")
+async def get_media(nome: str, expires: int, sig: str):
+    """
+    Serve uma mídia temporária (ex.: áudio de resposta buscado pelo Z-API) via URL assinada
+    """
+    caminho = media_store.caminho_valido(nome, expires, sig)
+    if caminho is None:
+        raise HTTPException(status_code=404, detail="Mídia não encontrada ou expirada")
+    extensao = nome.rsplit(".", 1)[-1]
+    return FileResponse(caminho, media_type=TIPOS_MIDIA[extensao], headers={"Cache-Control": "private, max-age=60"})
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter()
+
+@router.get("")
+async def metrics():
+    """
+    Métricas no formato de exposição do Prometheus
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -6,11 +6,12 @@ from app.services.financeiro_service import processar_boleto
 from app.services.voice_service import text_to_speech
 from app.utils.zapi_utils import enviar_mensagem_zapi, enviar_audio_zapi
 from app.services.whatsapp_service import WhatsAppService
+from app.services.webhook_queue import webhook_queue
+from app.services.message_dedup import message_dedup
 from app.schemas.webhook import WebhookResponse
+from app.core.logs import resumo
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -19,17 +20,32 @@ whatsapp_service = WhatsAppService()
 @router.post("/webhook", response_model=WebhookResponse)
 async def handle_webhook(request: Request):
     """
-    Processa webhooks do Z-API
+    Processa webhooks do Z-API (enfileira e responde na hora)
     """
     try:
         webhook_data = await request.json()
-        result = await whatsapp_service.handle_incoming_message(webhook_data)
+        if not webhook_data.get("phone"):
+            raise HTTPException(status_code=400, detail="Payload inválido: phone ausente")
         
-        if result.get("error"):
-            raise HTTPException(status_code=400, detail=result["error"])
+        # Descartar retries do Z-API já processados ou em processamento
+        message_id = webhook_data.get("messageId")
+        if not await message_dedup.iniciar(message_id):
+            return WebhookResponse(success=True)
+        
+        if not webhook_queue.enfileirar(
+            webhook_data["phone"],
+            lambda: message_dedup.executar(
+                message_id,
+                lambda: whatsapp_service.handle_incoming_message(webhook_data)
+            )
+        ):
+            await message_dedup.liberar(message_id)
+            raise HTTPException(status_code=503, detail="Fila de processamento cheia")
             
         return WebhookResponse(success=True)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar webhook: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -38,67 +54,77 @@ async def handle_webhook(request: Request):
 async def webhook_zapi(request: Request):
     try:
         payload = await request.json()
-        logger.info(f"Recebido webhook do Z-API: {payload}")
-        
-        numero = payload.get("phone")
-        tipo = payload.get("type")
+        logger.info("Recebido webhook do Z-API: %s", resumo(payload))
         
-        # Tratar callbacks de mensagem recebida
-        if tipo == "ReceivedCallback":
-            # Z-API envia a mensagem em payload["text"]["message"]
-            texto = payload.get("text", {}).get("message", "")
-            tipo = "message"  # normalizar para tratamento padrão
-        else:
-            texto = payload.get("text", "")
+        # Descartar retries do Z-API já processados ou em processamento
+        message_id = payload.get("messageId")
+        if not await message_dedup.iniciar(message_id):
+            return {"status": "duplicate"}
+        return await message_dedup.executar(message_id, lambda: _processar_zapi(payload))
         
-        if not numero or not tipo:
-            logger.error("Payload inválido: faltando campos obrigatórios")
-            return {"status": "error", "message": "Payload inválido"}
-        
-        if tipo not in ["message", "audio", "image", "document"]:
-            logger.info(f"Tipo de mensagem não suportado: {tipo}")
-            return {"status": "ignored"}
-            
-        # Se for áudio, pegar a URL
-        if tipo == "audio" and "audio" in payload:
-            audio_url = payload["audio"].get("url")
-            if audio_url:
-                texto = await text_to_speech(audio_url)
-        
-        # Se for imagem, pegar a URL
-        elif tipo == "image" and "image" in payload:
-            image_url = payload["image"].get("url")
-            if image_url:
-                texto = f"[Imagem recebida: {image_url}]"
+    except Exception as e:
+        logger.error(f"Erro no webhook: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+async def _processar_zapi(payload: dict):
+    """
+    Roteia uma mensagem recebida em /zapi para o serviço correspondente
+    """
+    numero = payload.get("phone")
+    tipo = payload.get("type")
+    
+    # Tratar callbacks de mensagem recebida
+    if tipo == "ReceivedCallback":
+        # Z-API envia a mensagem em payload["text"]["message"]
+        texto = payload.get("text", {}).get("message", "")
+        tipo = "message"  # normalizar para tratamento padrão
+    else:
+        texto = payload.get("text", "")
+    
+    if not numero or not tipo:
+        logger.error("Payload inválido: faltando campos obrigatórios")
+        return {"status": "error", "message": "Payload inválido"}
+    
+    if tipo not in ["message", "audio", "image", "document"]:
+        logger.info(f"Tipo de mensagem não suportado: {tipo}")
+        return {"status": "ignored"}
         
-        # Se for documento, pegar a URL
-        elif tipo == "document" and "document" in payload:
-            document_url = payload["document"].get("url")
-            if document_url:
-                texto = f"[Documento recebido: {document_url}]"
+    # Se for áudio, pegar a URL
+    if tipo == "audio" and "audio" in payload:
+        audio_url = payload["audio"].get("url")
+        if audio_url:
+            texto = await text_to_speech(audio_url)
+    
+    # Se for imagem, pegar a URL
+    elif tipo == "image" and "image" in payload:
+        image_url = payload["image"].get("url")
+        if image_url:
+            texto = f"[Imagem recebida: {image_url}]"
+    
+    # Se for documento, pegar a URL
+    elif tipo == "document" and "document" in payload:
+        document_url = payload["document"].get("url")
+        if document_url:
+            texto = f"[Documento recebido: {document_url}]"
 
-        # Detectar intenção
-        intencao = detectar_intencao(texto, numero)
-        logger.info(f"Intenção detectada: {intencao}")
+    # Detectar intenção
+    intencao = detectar_intencao(texto, numero)
+    logger.info(f"Intenção detectada: {intencao}")
 
-        # Rotear para o serviço correto
-        if intencao == "reenviar_boleto":
-            resposta = processar_boleto(numero)
-            await enviar_mensagem_zapi(numero, resposta)
-        elif intencao == "ajuda_prova_flexge":
-            resposta = processar_mastery_test(numero)
-            await enviar_mensagem_zapi(numero, resposta)
-        elif intencao == "duvida_gramatical":
-            resposta = processar_duvida_gramatical(numero, texto)
-            await enviar_mensagem_zapi(numero, resposta)
-        elif intencao == "resposta_audio":
-            audio_data = await text_to_speech(texto)
-            await enviar_audio_zapi(numero, audio_data)
-        else:
-            await enviar_mensagem_zapi(numero, "Desculpe, não entendi sua solicitação.")
+    # Rotear para o serviço correto
+    if intencao == "reenviar_boleto":
+        resposta = processar_boleto(numero)
+        await enviar_mensagem_zapi(numero, resposta)
+    elif intencao == "ajuda_prova_flexge":
+        resposta = await processar_mastery_test(numero)
+        await enviar_mensagem_zapi(numero, resposta)
+    elif intencao == "duvida_gramatical":
+        resposta = processar_duvida_gramatical(numero, texto)
+        await enviar_mensagem_zapi(numero, resposta)
+    elif intencao == "resposta_audio":
+        audio_data = await text_to_speech(texto)
+        await enviar_audio_zapi(numero, audio_data)
+    else:
+        await enviar_mensagem_zapi(numero, "Desculpe, não entendi sua solicitação.")
 
-        return {"status": "ok"}
-        
-    except Exception as e:
-        logger.error(f"Erro no webhook: {str(e)}")
-        return {"status": "error", "message": str(e)} 
\ No newline at end of file
+    return {"status": "ok"} 
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Circuit breakers por upstream (Z-API, Zaia, ElevenLabs, Notion, Flexge, Asaas, ...).
+
+Cada sessão aiohttp de app/core/http_client.py passa pelo breaker do seu
+upstream (via TraceConfig), então toda chamada a esses serviços é coberta
+sem mudanças nos chamadores:
+
+- fechado: as requisições passam; o resultado entra numa janela móvel de
+  BREAKER_WINDOW segundos. Com pelo menos BREAKER_MIN_REQUESTS na janela
+  e taxa de falhas >= BREAKER_ERROR_RATE, o breaker abre;
+- aberto: as requisições falham na hora com CircuitOpenError (subclasse
+  de aiohttp.ClientError, tratada pelos mesmos except) durante
+  BREAKER_OPEN_SECONDS;
+- semiaberto: passa até BREAKER_HALF_OPEN_MAX requisições de teste; um
+  sucesso fecha o breaker, uma falha o abre de novo.
+
+Contam como falha: erros de conexão, timeouts, 429 e 5xx. Outros 4xx
+(ex.: 404 do Notion) são respostas válidas do serviço.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Deque, Dict, List, Optional
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.metrics import BREAKER_ESTADO, BREAKER_REJEICOES
+
+logger = logging.getLogger(__name__)
+
+FECHADO = "fechado"
+SEMIABERTO = "semiaberto"
+ABERTO = "aberto"
+
+_VALOR_ESTADO = {FECHADO: 0, SEMIABERTO: 1, ABERTO: 2}
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    def __init__(self, upstream: str):
+        super().__init__(f"Circuito de {upstream} aberto: serviço temporariamente indisponível")
+        self.upstream = upstream
+
+
+def falha_http(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        nome: str,
+        janela: Optional[float] = None,
+        minimo: Optional[int] = None,
+        taxa_erro: Optional[float] = None,
+        tempo_aberto: Optional[float] = None,
+        testes_semiaberto: Optional[int] = None,
+    ):
+        self.nome = nome
+        self.janela = janela or settings.BREAKER_WINDOW
+        self.minimo = minimo or settings.BREAKER_MIN_REQUESTS
+        self.taxa_erro = taxa_erro or settings.BREAKER_ERROR_RATE
+        self.tempo_aberto = tempo_aberto or settings.BREAKER_OPEN_SECONDS
+        self.testes_semiaberto = testes_semiaberto or settings.BREAKER_HALF_OPEN_MAX
+        # (segundo, total, falhas), um bucket por segundo da janela
+        self._buckets: Deque[List] = deque()
+        self._estado = FECHADO
+        self._aberto_em = 0.0
+        self._testes_em_andamento = 0
+        self.rejeitadas = 0
+        BREAKER_ESTADO.labels(nome).set(0)
+
+    def _mudar(self, estado: str):
+        if estado != self._estado:
+            logger.warning(f"Circuit breaker de {self.nome}: {self._estado} -> {estado}")
+            self._estado = estado
+            BREAKER_ESTADO.labels(self.nome).set(_VALOR_ESTADO[estado])
+
+    def _descartar_antigos(self, agora: float):
+        limite = int(agora - self.janela)
+        while self._buckets and self._buckets[0][0] <= limite:
+            self._buckets.popleft()
+
+    def _totais(self):
+        total = sum(b[1] for b in self._buckets)
+        falhas = sum(b[2] for b in self._buckets)
+        return total, falhas
+
+    @property
+    def estado(self) -> str:
+        if self._estado == ABERTO and time.monotonic() - self._aberto_em >= self.tempo_aberto:
+            self._mudar(SEMIABERTO)
+        return self._estado
+
+    def permitir(self) -> bool:
+        """
+        Reserva a passagem de uma requisição; False se o breaker a recusa
+        """
+        estado = self.estado
+        if estado == FECHADO:
+            return True
+        if estado == SEMIABERTO and self._testes_em_andamento < self.testes_semiaberto:
+            self._testes_em_andamento += 1
+            return True
+        self.rejeitadas += 1
+        BREAKER_REJEICOES.labels(self.nome).inc()
+        return False
+
+    def registrar(self, sucesso: bool):
+        """
+        Registra o resultado de uma requisição permitida por permitir()
+        """
+        agora = time.monotonic()
+        if self._estado == SEMIABERTO:
+            self._testes_em_andamento = max(0, self._testes_em_andamento - 1)
+            if sucesso:
+                self._buckets.clear()
+                self._mudar(FECHADO)
+            else:
+                self._abrir(agora)
+            return
+        if self._estado == ABERTO:
+            # Requisição iniciada antes de abrir: não altera o estado
+            return
+
+        self._descartar_antigos(agora)
+        segundo = int(agora)
+        if not self._buckets or self._buckets[-1][0] != segundo:
+            self._buckets.append([segundo, 0, 0])
+        self._buckets[-1][1] += 1
+        if not sucesso:
+            self._buckets[-1][2] += 1
+            total, falhas = self._totais()
+            if total >= self.minimo and falhas / total >= self.taxa_erro:
+                self._abrir(agora)
+
+    def cancelar(self):
+        """
+        Requisição permitida e cancelada pelo chamador: libera a vaga de teste sem registrar resultado
+        """
+        if self._estado == SEMIABERTO:
+            self._testes_em_andamento = max(0, self._testes_em_andamento - 1)
+
+    def _abrir(self, agora: float):
+        self._aberto_em = agora
+        self._testes_em_andamento = 0
+        self._mudar(ABERTO)
+
+    def resumo(self) -> Dict:
+        self._descartar_antigos(time.monotonic())
+        total, falhas = self._totais()
+        return {
+            "estado": self.estado,
+            "requisicoes_janela": total,
+            "falhas_janela": falhas,
+            "rejeitadas": self.rejeitadas,
+        }
+
+
+class CircuitBreakerRegistry:
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, upstream: str) -> CircuitBreaker:
+        breaker = self._breakers.get(upstream)
+        if breaker is None:
+            breaker = self._breakers[upstream] = CircuitBreaker(upstream)
+        return breaker
+
+    def aberto(self, upstream: str) -> bool:
+        return self.breaker(upstream).estado == ABERTO
+
+    def estados(self) -> Dict[str, Dict]:
+        return {nome: breaker.resumo() for nome, breaker in self._breakers.items()}
+
+
+circuitos = CircuitBreakerRegistry()
+
+
+def trace_config_circuito(upstream: str) -> aiohttp.TraceConfig:
+    """
+    TraceConfig do aiohttp que aplica o breaker do upstream a cada requisição
+    da sessão (deve ser o primeiro da lista de trace_configs)
+    """
+    breaker = circuitos.breaker(upstream)
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+
+    async def on_request_start(session, ctx, params):
+        if not settings.BREAKER_ENABLED:
+            return
+        if not breaker.permitir():
+            raise CircuitOpenError(upstream)
+        ctx.permitida = True
+
+    async def on_request_end(session, ctx, params):
+        if getattr(ctx, "permitida", False):
+            breaker.registrar(not falha_http(params.response.status))
+
+    async def on_request_exception(session, ctx, params):
+        if not getattr(ctx, "permitida", False):
+            return
+        if isinstance(params.exception, asyncio.CancelledError):
+            breaker.cancelar()
+        else:
+            breaker.registrar(False)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
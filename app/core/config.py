@@ -9,6 +9,10 @@ class Settings(BaseSettings):
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", 587))
     SMTP_USER: str = os.getenv("SMTP_USER")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD")
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", 30))
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", 2))
+    SMTP_BATCH_SIZE: int = int(os.getenv("SMTP_BATCH_SIZE", 50))
     ZAIA_API_KEY: str = os.getenv("ZAIA_API_KEY")
     ZAIA_API_URL: str = os.getenv("ZAIA_API_URL", "https://api.zaia.app")
     ZAIA_AGENT_ID: int = int(os.getenv("ZAIA_AGENT_ID", "34790"))
@@ -16,6 +20,8 @@ class Settings(BaseSettings):
     ASAAS_BASE: str = os.getenv("ASAAS_BASE", "https://api.asaas.com/v3")
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY", "sk_cb5ba1fb644bd866d8449cd19bc6f052f999fd3777827b56")
     ELEVENLABS_VOICE_ID: str = os.getenv("ELEVENLABS_VOICE_ID", "ie5yJLYeLpsuijLaojmF")
+    ELEVENLABS_API_BASE: str = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io")
+    ELEVENLABS_STREAMING: bool = os.getenv("ELEVENLABS_STREAMING", "true").lower() == "true"
     ZAPI_INSTANCE_ID: str = os.getenv("ZAPI_INSTANCE_ID")
     ZAPI_TOKEN: str = os.getenv("ZAPI_TOKEN")
     ZAPI_SECURITY_TOKEN: str = os.getenv("ZAPI_SECURITY_TOKEN")
@@ -24,6 +30,91 @@ class Settings(BaseSettings):
     ALLOWED_EXTENSIONS: set = {'png', 'jpg', 'jpeg', 'gif'}
     MAX_FILE_SIZE: int = 5 * 1024 * 1024
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", 100))
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    ZAPI_HTTP_TIMEOUT: float = float(os.getenv("ZAPI_HTTP_TIMEOUT", 30))
+    ZAPI_RATE_LIMIT: float = float(os.getenv("ZAPI_RATE_LIMIT", 5))
+    ZAPI_RATE_BURST: float = float(os.getenv("ZAPI_RATE_BURST", 10))
+    ZAPI_MAX_RETRIES: int = int(os.getenv("ZAPI_MAX_RETRIES", 3))
+    ZAPI_RETRY_BASE_DELAY: float = float(os.getenv("ZAPI_RETRY_BASE_DELAY", 0.5))
+    ZAPI_DISPATCH_WORKERS: int = int(os.getenv("ZAPI_DISPATCH_WORKERS", 8))
+    ZAPI_QUEUE_MAXSIZE: int = int(os.getenv("ZAPI_QUEUE_MAXSIZE", 5000))
+    ZAPI_MAX_TEXT_LENGTH: int = int(os.getenv("ZAPI_MAX_TEXT_LENGTH", 4000))
+    ZAPI_AUDIO_DELIVERY: str = os.getenv("ZAPI_AUDIO_DELIVERY", "base64")
+    PUBLIC_BASE_URL: str = os.getenv("PUBLIC_BASE_URL", "")
+    MEDIA_STORE_DIR: str = os.getenv("MEDIA_STORE_DIR", "./.cache/media")
+    MEDIA_URL_TTL: float = float(os.getenv("MEDIA_URL_TTL", 600))
+    MEDIA_URL_SECRET: str = os.getenv("MEDIA_URL_SECRET", "")
+    ZAIA_HTTP_TIMEOUT: float = float(os.getenv("ZAIA_HTTP_TIMEOUT", 30))
+    ELEVENLABS_HTTP_TIMEOUT: float = float(os.getenv("ELEVENLABS_HTTP_TIMEOUT", 60))
+    NOTION_HTTP_TIMEOUT: float = float(os.getenv("NOTION_HTTP_TIMEOUT", 10))
+    FLEXGE_HTTP_TIMEOUT: float = float(os.getenv("FLEXGE_HTTP_TIMEOUT", 10))
+    ASAAS_HTTP_TIMEOUT: float = float(os.getenv("ASAAS_HTTP_TIMEOUT", 15))
+    MEDIA_HTTP_TIMEOUT: float = float(os.getenv("MEDIA_HTTP_TIMEOUT", 30))
+    OPENAI_HTTP_TIMEOUT: float = float(os.getenv("OPENAI_HTTP_TIMEOUT", 60))
+    BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+    BREAKER_WINDOW: float = float(os.getenv("BREAKER_WINDOW", 30))
+    BREAKER_MIN_REQUESTS: int = int(os.getenv("BREAKER_MIN_REQUESTS", 10))
+    BREAKER_ERROR_RATE: float = float(os.getenv("BREAKER_ERROR_RATE", 0.5))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+    BREAKER_HALF_OPEN_MAX: int = int(os.getenv("BREAKER_HALF_OPEN_MAX", 1))
+    AUDIO_MAX_BYTES: int = int(os.getenv("AUDIO_MAX_BYTES", 25 * 1024 * 1024))
+    ZAIA_REPLY_TIMEOUT: float = float(os.getenv("ZAIA_REPLY_TIMEOUT", 20))
+    ZAIA_POLL_MIN_INTERVAL: float = float(os.getenv("ZAIA_POLL_MIN_INTERVAL", 0.5))
+    ZAIA_POLL_MAX_INTERVAL: float = float(os.getenv("ZAIA_POLL_MAX_INTERVAL", 3))
+    ZAIA_POLL_BACKOFF: float = float(os.getenv("ZAIA_POLL_BACKOFF", 1.5))
+    ZAIA_POLL_BATCH_SIZE: int = int(os.getenv("ZAIA_POLL_BATCH_SIZE", 50))
+    ZAIA_SESSION_INACTIVITY: float = float(os.getenv("ZAIA_SESSION_INACTIVITY", 1800))
+    ZAIA_SESSION_MAXSIZE: int = int(os.getenv("ZAIA_SESSION_MAXSIZE", 10000))
+    WEBHOOK_QUEUE_WORKERS: int = int(os.getenv("WEBHOOK_QUEUE_WORKERS", 16))
+    WEBHOOK_QUEUE_MAXSIZE: int = int(os.getenv("WEBHOOK_QUEUE_MAXSIZE", 1000))
+    WEBHOOK_QUEUE_DRAIN_TIMEOUT: float = float(os.getenv("WEBHOOK_QUEUE_DRAIN_TIMEOUT", 25))
+    WHATSAPP_COALESCE_QUIET: float = float(os.getenv("WHATSAPP_COALESCE_QUIET", 2))
+    WHATSAPP_COALESCE_MAX_WAIT: float = float(os.getenv("WHATSAPP_COALESCE_MAX_WAIT", 6))
+    WEBHOOK_DEDUP_MAXSIZE: int = int(os.getenv("WEBHOOK_DEDUP_MAXSIZE", 10000))
+    WEBHOOK_DEDUP_WINDOW: float = float(os.getenv("WEBHOOK_DEDUP_WINDOW", 3600))
+    WEBHOOK_DEDUP_PROCESSING_TIMEOUT: float = float(os.getenv("WEBHOOK_DEDUP_PROCESSING_TIMEOUT", 300))
+    WEBHOOK_DEDUP_PERSIST: bool = os.getenv("WEBHOOK_DEDUP_PERSIST", "false").lower() == "true"
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", "./.cache/tts")
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+    FFMPEG_PATH: str = os.getenv("FFMPEG_PATH", "ffmpeg")
+    FFMPEG_MAX_CONCURRENCY: int = int(os.getenv("FFMPEG_MAX_CONCURRENCY", 4))
+    FFMPEG_TIMEOUT: float = float(os.getenv("FFMPEG_TIMEOUT", 30))
+    ALUNO_CACHE_MAXSIZE: int = int(os.getenv("ALUNO_CACHE_MAXSIZE", 2048))
+    ALUNO_CACHE_TTL: float = float(os.getenv("ALUNO_CACHE_TTL", 600))
+    ALUNO_CACHE_NEGATIVE_TTL: float = float(os.getenv("ALUNO_CACHE_NEGATIVE_TTL", 60))
+    VISION_CACHE_MAXSIZE: int = int(os.getenv("VISION_CACHE_MAXSIZE", 512))
+    VISION_CACHE_TTL: float = float(os.getenv("VISION_CACHE_TTL", 86400))
+    VISION_MAX_BYTES: int = int(os.getenv("VISION_MAX_BYTES", 10 * 1024 * 1024))
+    EXPLICACAO_TIMEOUT: float = float(os.getenv("EXPLICACAO_TIMEOUT", 10))
+    EXPLICACAO_MAX_CONCURRENCY: int = int(os.getenv("EXPLICACAO_MAX_CONCURRENCY", 4))
+    EXPLICACAO_CACHE_MAXSIZE: int = int(os.getenv("EXPLICACAO_CACHE_MAXSIZE", 2048))
+    EXPLICACAO_CACHE_TTL: float = float(os.getenv("EXPLICACAO_CACHE_TTL", 86400))
+    EXPLICACAO_WARMUP_ENABLED: bool = os.getenv("EXPLICACAO_WARMUP_ENABLED", "true").lower() == "true"
+    EXPLICACAO_WARMUP_INTERVAL: float = float(os.getenv("EXPLICACAO_WARMUP_INTERVAL", 86400))
+    EXPLICACAO_WARMUP_RETRY: float = float(os.getenv("EXPLICACAO_WARMUP_RETRY", 600))
+    EXPLICACAO_WARMUP_CONCURRENCY: int = int(os.getenv("EXPLICACAO_WARMUP_CONCURRENCY", 2))
+    ASAAS_CUSTOMER_CACHE_MAXSIZE: int = int(os.getenv("ASAAS_CUSTOMER_CACHE_MAXSIZE", 20000))
+    ASAAS_CUSTOMER_CACHE_TTL: float = float(os.getenv("ASAAS_CUSTOMER_CACHE_TTL", 7 * 86400))
+    ASAAS_CUSTOMER_NEGATIVE_TTL: float = float(os.getenv("ASAAS_CUSTOMER_NEGATIVE_TTL", 300))
+    ASAAS_PAYMENTS_CACHE_TTL: float = float(os.getenv("ASAAS_PAYMENTS_CACHE_TTL", 300))
+    ASAAS_CUSTOMER_SYNC_ENABLED: bool = os.getenv("ASAAS_CUSTOMER_SYNC_ENABLED", "false").lower() == "true"
+    ASAAS_CUSTOMER_SYNC_INTERVAL: float = float(os.getenv("ASAAS_CUSTOMER_SYNC_INTERVAL", 86400))
+    ASAAS_MAX_CONCURRENCY: int = int(os.getenv("ASAAS_MAX_CONCURRENCY", 4))
+    FLEXGE_MAX_CONCURRENCY: int = int(os.getenv("FLEXGE_MAX_CONCURRENCY", 8))
+    FLEXGE_BULK_CHUNK_SIZE: int = int(os.getenv("FLEXGE_BULK_CHUNK_SIZE", 100))
+    FLEXGE_INDEX_CONCURRENCY: int = int(os.getenv("FLEXGE_INDEX_CONCURRENCY", 8))
+    FLEXGE_INDEX_REFRESH_INTERVAL: float = float(os.getenv("FLEXGE_INDEX_REFRESH_INTERVAL", 900))
+    FLEXGE_INDEX_MISS_REFRESH: float = float(os.getenv("FLEXGE_INDEX_MISS_REFRESH", 120))
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_MAX_FIELD_LENGTH: int = int(os.getenv("LOG_MAX_FIELD_LENGTH", 500))
+    LOG_MAX_MESSAGE_LENGTH: int = int(os.getenv("LOG_MAX_MESSAGE_LENGTH", 4000))
+    LOG_DEBUG_SAMPLE_EVERY: int = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", 1))
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,75 @@
+"""
+Acesso ao SQLite configurado em DATABASE_URL.
+
+Usado pelos stores persistentes pequenos (sessões da Zaia, etc.), que
+precisam ser compartilhados entre workers do uvicorn e sobreviver a
+restarts. Se DATABASE_URL não apontar para SQLite, sqlite_path()
+retorna None e os stores funcionam apenas em memória.
+"""
+import logging
+import sqlite3
+import threading
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_path(database_url: Optional[str] = None) -> Optional[str]:
+    """
+    Extrai o caminho do arquivo de uma URL sqlite:///caminho
+    """
+    url = database_url if database_url is not None else settings.DATABASE_URL
+    if not url or not url.startswith("sqlite://"):
+        return None
+    path = url[len("sqlite://"):]
+    if path.startswith("/"):
+        path = path[1:]
+    return path or ":memory:"
+
+
+class SQLiteConnection:
+    """
+    Conexão SQLite compartilhada entre threads, protegida por lock.
+    As chamadas devem ser feitas fora do event loop (asyncio.to_thread).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            # WAL permite leitores e um escritor simultâneos entre processos
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
+
+    def execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            conn = self._conectar()
+            with conn:
+                return conn.execute(sql, params).fetchall()
+
+    def execute_rowcount(self, sql: str, params: tuple = ()) -> int:
+        """
+        Executa um comando de escrita e retorna o número de linhas afetadas
+        """
+        with self._lock:
+            conn = self._conectar()
+            with conn:
+                return conn.execute(sql, params).rowcount
+
+    def executescript(self, sql: str):
+        with self._lock:
+            self._conectar().executescript(sql)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,106 @@
+"""
+Clientes HTTP compartilhados por upstream.
+
+Cada integração (Z-API, Zaia, ElevenLabs, ...) usa uma única
+aiohttp.ClientSession durante toda a vida da aplicação, com pool de
+conexões keep-alive, limite de conexões por host, cache de DNS, timeout
+total próprio (UPSTREAM_TIMEOUTS) e circuit breaker (app/core/circuit_breaker.py).
+As sessões são abertas no lifespan do FastAPI (app/main.py) e fechadas
+no shutdown. O cliente assíncrono da OpenAI (que usa seu próprio pool
+httpx) também é compartilhado e fechado junto.
+"""
+import logging
+from typing import Dict, Optional
+
+import aiohttp
+import openai
+
+from app.core.circuit_breaker import trace_config_circuito
+from app.core.config import settings
+from app.core.metrics import trace_config_upstream
+
+logger = logging.getLogger(__name__)
+
+# upstream -> nome da configuração com o timeout total (em segundos)
+UPSTREAM_TIMEOUTS = {
+    "zapi": "ZAPI_HTTP_TIMEOUT",
+    "zaia": "ZAIA_HTTP_TIMEOUT",
+    "elevenlabs": "ELEVENLABS_HTTP_TIMEOUT",
+    "notion": "NOTION_HTTP_TIMEOUT",
+    "flexge": "FLEXGE_HTTP_TIMEOUT",
+    "media": "MEDIA_HTTP_TIMEOUT",
+    "asaas": "ASAAS_HTTP_TIMEOUT",
+}
+
+
+class HttpClientRegistry:
+    """
+    Registro de sessões aiohttp, uma por upstream
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._openai: Optional[openai.AsyncOpenAI] = None
+
+    def _criar_sessao(self, upstream: str) -> aiohttp.ClientSession:
+        timeout_total = getattr(settings, UPSTREAM_TIMEOUTS.get(upstream, ""), None)
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=timeout_total,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+        )
+        logger.info(f"Abrindo pool HTTP para {upstream} (timeout={timeout_total}s)")
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[trace_config_circuito(upstream), trace_config_upstream(upstream)],
+        )
+
+    async def start(self):
+        """
+        Abre as sessões de todos os upstreams conhecidos
+        """
+        for upstream in UPSTREAM_TIMEOUTS:
+            self.session(upstream)
+
+    def session(self, upstream: str) -> aiohttp.ClientSession:
+        """
+        Retorna a sessão do upstream, criando-a se ainda não existir
+        """
+        session: Optional[aiohttp.ClientSession] = self._sessions.get(upstream)
+        if session is None or session.closed:
+            session = self._criar_sessao(upstream)
+            self._sessions[upstream] = session
+        return session
+
+    def openai(self) -> openai.AsyncOpenAI:
+        """
+        Retorna o cliente assíncrono da OpenAI, criando-o se ainda não existir
+        """
+        if self._openai is None:
+            self._openai = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                timeout=settings.OPENAI_HTTP_TIMEOUT,
+            )
+        return self._openai
+
+    async def close(self):
+        """
+        Fecha todas as sessões abertas
+        """
+        cliente_openai, self._openai = self._openai, None
+        if cliente_openai is not None:
+            await cliente_openai.close()
+        sessions, self._sessions = self._sessions, {}
+        for upstream, session in sessions.items():
+            if not session.closed:
+                await session.close()
+                logger.info(f"Pool HTTP de {upstream} fechado")
+
+
+http_clients = HttpClientRegistry()
@@ -0,0 +1,196 @@
+"""
+Configuração de logging da aplicação.
+
+- Formatação preguiçosa: payloads são passados como argumentos
+  (logger.info("Payload: %s", resumo(payload))) e só são redigidos e
+  serializados se o registro for de fato emitido.
+- Redação automática: blobs de áudio/base64 viram "<base64 N chars>",
+  chaves sensíveis (tokens, senhas, api keys) e o token do Z-API nas
+  URLs viram "***" e CPFs formatados (000.000.000-00) são mascarados. No
+  texto das mensagens (chaves como "message"/"text", ou resumo(...,
+  texto_livre=True)) também são mascarados CPFs digitados sem pontuação.
+  Cada string é truncada em LOG_MAX_FIELD_LENGTH caracteres.
+- Amostragem: registros DEBUG repetidos (mesmo logger e mesma mensagem
+  modelo) são emitidos 1 a cada LOG_DEBUG_SAMPLE_EVERY.
+- Saída em JSON (LOG_FORMAT=json) ou texto (LOG_FORMAT=text).
+"""
+import json
+import logging
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+# Chaves cujo valor nunca deve aparecer no log (comparadas em minúsculas, sem "-" e "_")
+_CHAVES_SENSIVEIS = {
+    "token", "clienttoken", "accesstoken", "apikey", "xiapikey", "authorization",
+    "password", "senha", "secret", "cpf", "cpfcnpj",
+}
+_CHAVES_BASE64 = {"audio", "base64", "image", "file", "document"}
+# Chaves com texto escrito pelo aluno (ou para ele), onde 11 dígitos soltos podem ser um CPF
+_CHAVES_TEXTO = {"message", "text", "body", "caption", "prompt", "mensagem", "texto"}
+
+_DATA_URL = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+")
+_BASE64_LONGO = re.compile(r"[A-Za-z0-9+/]{200,}={0,2}")
+# Só o formato pontuado: 11 dígitos soltos costumam ser telefones (CPFs sem
+# pontuação são mascarados pelas chaves "cpf"/"cpfcnpj")
+_CPF = re.compile(r"(?<!\d)\d{3}\.\d{3}\.\d{3}-\d{2}(?!\d)")
+_CPF_SEM_PONTUACAO = re.compile(r"(?<!\d)\d{11}(?!\d)")
+# Token do Z-API embutido no caminho da URL (/instances/<id>/token/<token>/...)
+_TOKEN_URL = re.compile(r"(/token/)[^/\s?]+")
+
+_PROFUNDIDADE_MAXIMA = 6
+
+
+def _normalizar_chave(chave: Any) -> str:
+    return str(chave).lower().replace("-", "").replace("_", "")
+
+
+def _redigir_texto(texto: str, limite: int, texto_livre: bool = False) -> str:
+    texto = _DATA_URL.sub(lambda m: f"<base64 {len(m.group(0))} chars>", texto)
+    texto = _BASE64_LONGO.sub(lambda m: f"<base64 {len(m.group(0))} chars>", texto)
+    texto = _CPF.sub("***.***.***-**", texto)
+    if texto_livre:
+        texto = _CPF_SEM_PONTUACAO.sub("***********", texto)
+    texto = _TOKEN_URL.sub(r"\1***", texto)
+    if len(texto) > limite:
+        texto = f"{texto[:limite]}…(+{len(texto) - limite} chars)"
+    return texto
+
+
+def redigir(valor: Any, limite: Optional[int] = None, _profundidade: int = 0, texto_livre: bool = False) -> Any:
+    """
+    Cópia do valor pronta para log: sem segredos, sem blobs e com strings truncadas.
+    texto_livre: o valor é texto de mensagem (mascara também CPFs sem pontuação)
+    """
+    limite = limite or settings.LOG_MAX_FIELD_LENGTH
+    if _profundidade > _PROFUNDIDADE_MAXIMA:
+        return "…"
+    if isinstance(valor, dict):
+        resultado = {}
+        for chave, item in valor.items():
+            normalizada = _normalizar_chave(chave)
+            if normalizada in _CHAVES_SENSIVEIS and item:
+                resultado[chave] = "***"
+            elif normalizada in _CHAVES_BASE64 and isinstance(item, str) and len(item) > limite:
+                resultado[chave] = f"<base64 {len(item)} chars>"
+            else:
+                resultado[chave] = redigir(
+                    item, limite, _profundidade + 1, texto_livre or normalizada in _CHAVES_TEXTO
+                )
+        return resultado
+    if isinstance(valor, (list, tuple)):
+        itens = [redigir(item, limite, _profundidade + 1, texto_livre) for item in valor[:50]]
+        if len(valor) > 50:
+            itens.append(f"…(+{len(valor) - 50} itens)")
+        return itens
+    if isinstance(valor, (bytes, bytearray)):
+        return f"<{len(valor)} bytes>"
+    if isinstance(valor, str):
+        return _redigir_texto(valor, limite, texto_livre)
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    return _redigir_texto(str(valor), limite, texto_livre)
+
+
+class resumo:
+    """
+    Wrapper preguiçoso para usar como argumento de log: a redação e a
+    serialização só acontecem em __str__, quando o registro é emitido
+    (texto_livre=True para o texto de uma mensagem)
+    """
+    __slots__ = ("valor", "limite", "texto_livre")
+
+    def __init__(self, valor: Any, limite: Optional[int] = None, texto_livre: bool = False):
+        self.valor = valor
+        self.limite = limite
+        self.texto_livre = texto_livre
+
+    def __str__(self) -> str:
+        redigido = redigir(self.valor, self.limite, texto_livre=self.texto_livre)
+        if isinstance(redigido, str):
+            return redigido
+        return json.dumps(redigido, ensure_ascii=False, default=str)
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class FiltroRedacao(logging.Filter):
+    """
+    Redige a mensagem final (inclusive logs em f-string que já chegam formatados)
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        mensagem = record.getMessage()
+        redigida = _redigir_texto(mensagem, settings.LOG_MAX_MESSAGE_LENGTH)
+        if redigida != mensagem or record.args:
+            record.msg = redigida
+            record.args = None
+        return True
+
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Emite 1 a cada N registros DEBUG com a mesma mensagem modelo
+    """
+
+    def __init__(self, a_cada: int):
+        super().__init__()
+        self.a_cada = max(1, a_cada)
+        self._contadores: Dict[tuple, int] = defaultdict(int)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.a_cada == 1:
+            return True
+        chave = (record.name, str(record.msg)[:80])
+        contador = self._contadores[chave]
+        self._contadores[chave] = contador + 1
+        if len(self._contadores) > 10000:
+            self._contadores.clear()
+        return contador % self.a_cada == 0
+
+
+# Atributos padrão do LogRecord (o resto veio de extra=... e vira campo do JSON)
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class FormatadorJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        extras = {
+            chave: valor for chave, valor in vars(record).items()
+            if chave not in _ATRIBUTOS_RECORD and not chave.startswith("_")
+        }
+        if extras:
+            dados.update(redigir(extras))
+        if record.exc_info:
+            dados["exc"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+def configurar_logging():
+    """
+    Configura o logger raiz conforme LOG_LEVEL, LOG_FORMAT e LOG_DEBUG_SAMPLE_EVERY
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(FormatadorJSON())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(FiltroAmostragem(settings.LOG_DEBUG_SAMPLE_EVERY))
+    handler.addFilter(FiltroRedacao())
+
+    raiz = logging.getLogger()
+    for antigo in list(raiz.handlers):
+        raiz.removeHandler(antigo)
+    raiz.addHandler(handler)
+    raiz.setLevel(settings.LOG_LEVEL.upper())
@@ -0,0 +1,148 @@
+"""
+Armazenamento temporário de mídias geradas (áudios de resposta) servidas
+por URL assinada em /api/media.
+
+Em vez de mandar o OGG ao Z-API como data URL base64 no corpo do JSON, o
+áudio é gravado em MEDIA_STORE_DIR e o Z-API recebe uma URL pública
+(PUBLIC_BASE_URL) com expiração e assinatura HMAC:
+
+    {PUBLIC_BASE_URL}/api/media/<nome>.ogg?expires=<epoch>&sig=<hmac>
+
+Os arquivos expiram após MEDIA_URL_TTL segundos e são removidos em uma
+varredura feita, no máximo, uma vez por minuto durante as publicações.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import tempfile
+import time
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TIPOS_MIDIA = {
+    "ogg": "audio/ogg",
+    "mp3": "audio/mpeg",
+}
+
+_NOME_VALIDO = re.compile(r"^[A-Za-z0-9_-]{16,64}\.(ogg|mp3)$")
+
+# Folga além da expiração da URL antes de apagar o arquivo (download em andamento)
+_FOLGA_REMOCAO = 60
+_INTERVALO_VARREDURA = 60
+
+
+def _segredo_padrao() -> bytes:
+    if settings.MEDIA_URL_SECRET:
+        return settings.MEDIA_URL_SECRET.encode("utf-8")
+    base = settings.ZAPI_SECURITY_TOKEN or settings.ZAPI_TOKEN
+    if base:
+        # Estável entre workers sem exigir mais uma variável de ambiente
+        return hashlib.sha256(f"media-url:{base}".encode("utf-8")).digest()
+    logger.warning("MEDIA_URL_SECRET não definido: URLs de mídia valem só para este processo")
+    return secrets.token_bytes(32)
+
+
+class MediaStore:
+    def __init__(
+        self,
+        diretorio: Optional[str] = None,
+        ttl: Optional[float] = None,
+        base_url: Optional[str] = None,
+        segredo: Optional[bytes] = None,
+    ):
+        self.diretorio = diretorio or settings.MEDIA_STORE_DIR
+        self.ttl = ttl if ttl is not None else settings.MEDIA_URL_TTL
+        self.base_url = (base_url if base_url is not None else settings.PUBLIC_BASE_URL).rstrip("/")
+        self._segredo = segredo
+        self._ultima_varredura = 0.0
+        self.publicadas = 0
+        self.removidas = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return bool(self.base_url)
+
+    def _chave(self) -> bytes:
+        if self._segredo is None:
+            self._segredo = _segredo_padrao()
+        return self._segredo
+
+    def assinar(self, nome: str, expires: int) -> str:
+        mensagem = f"{nome}:{expires}".encode("utf-8")
+        return hmac.new(self._chave(), mensagem, hashlib.sha256).hexdigest()
+
+    def caminho_valido(self, nome: str, expires: int, sig: str) -> Optional[str]:
+        """
+        Caminho do arquivo se a assinatura confere e a URL não expirou; senão None
+        """
+        if not _NOME_VALIDO.match(nome) or expires < time.time():
+            return None
+        if not hmac.compare_digest(self.assinar(nome, expires), sig or ""):
+            return None
+        caminho = os.path.join(self.diretorio, nome)
+        return caminho if os.path.isfile(caminho) else None
+
+    # --- Disco (executado em thread) --------------------------------------
+
+    def _gravar(self, nome: str, conteudo: bytes):
+        os.makedirs(self.diretorio, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, os.path.join(self.diretorio, nome))
+        except BaseException:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+
+    def _varrer(self):
+        limite = time.time() - self.ttl - _FOLGA_REMOCAO
+        try:
+            entradas = list(os.scandir(self.diretorio))
+        except FileNotFoundError:
+            return
+        for entrada in entradas:
+            try:
+                if entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+                    self.removidas += 1
+            except OSError:
+                pass
+
+    # --- API ---------------------------------------------------------------
+
+    async def publicar(self, conteudo: bytes, extensao: str = "ogg") -> str:
+        """
+        Grava a mídia e retorna a URL pública assinada (levanta exceção em caso de falha)
+        """
+        if not self.habilitado:
+            raise RuntimeError("PUBLIC_BASE_URL não configurada")
+        nome = f"{secrets.token_urlsafe(18)}.{extensao}"
+        await asyncio.to_thread(self._gravar, nome, conteudo)
+        self.publicadas += 1
+
+        agora = time.time()
+        if agora - self._ultima_varredura > _INTERVALO_VARREDURA:
+            self._ultima_varredura = agora
+            await asyncio.to_thread(self._varrer)
+
+        expires = int(agora + self.ttl)
+        query = urlencode({"expires": expires, "sig": self.assinar(nome, expires)})
+        return f"{self.base_url}/api/media/{nome}?{query}"
+
+    def metricas(self) -> Dict[str, int]:
+        return {"publicadas": self.publicadas, "removidas": self.removidas}
+
+
+media_store = MediaStore()
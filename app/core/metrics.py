@@ -0,0 +1,137 @@
+"""
+Métricas Prometheus da aplicação (expostas em /metrics).
+
+- whatsapp_etapa_duracao_segundos / _em_andamento / _erros_total: cada
+  etapa do atendimento (Notion, transcrição, visão, Zaia, TTS, ffmpeg,
+  envio pelo Z-API), medida com medir_etapa(). "zapi_fila" é a espera
+  do envio na fila do despachante do Z-API. No modo streaming a etapa
+  "tts" inclui a codificação, que também aparece em "ffmpeg".
+- upstream_*: toda requisição feita pelas sessões de app/core/http_client.py,
+  por upstream e código de status (coletado via TraceConfig do aiohttp).
+- circuit_breaker_*: estado e recusas dos breakers de app/core/circuit_breaker.py.
+- Profundidade das filas, registrada por cada fila com registrar_fila().
+
+Os labels só recebem valores de conjuntos fechados (nomes de etapa,
+upstream, status HTTP); telefone, email ou ids nunca viram label.
+"""
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Callable
+
+import aiohttp
+from prometheus_client import Counter, Gauge, Histogram
+
+_BUCKETS_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+ETAPA_DURACAO = Histogram(
+    "whatsapp_etapa_duracao_segundos",
+    "Duração de cada etapa do atendimento",
+    ["etapa"],
+    buckets=_BUCKETS_SEGUNDOS,
+)
+ETAPA_EM_ANDAMENTO = Gauge(
+    "whatsapp_etapa_em_andamento",
+    "Execuções em andamento por etapa",
+    ["etapa"],
+)
+ETAPA_ERROS = Counter(
+    "whatsapp_etapa_erros_total",
+    "Etapas encerradas com exceção",
+    ["etapa"],
+)
+
+UPSTREAM_DURACAO = Histogram(
+    "upstream_requisicao_duracao_segundos",
+    "Duração das requisições HTTP por upstream",
+    ["upstream"],
+    buckets=_BUCKETS_SEGUNDOS,
+)
+UPSTREAM_REQUISICOES = Counter(
+    "upstream_requisicoes_total",
+    "Requisições HTTP por upstream e código de status",
+    ["upstream", "status"],
+)
+UPSTREAM_ERROS = Counter(
+    "upstream_erros_total",
+    "Respostas de erro (status >= 400) ou falhas de conexão por upstream",
+    ["upstream", "status"],
+)
+
+ZAPI_RETENTATIVAS = Counter(
+    "zapi_retentativas_total",
+    "Envios ao Z-API repetidos após 429, 5xx ou falha de conexão",
+    ["status"],
+)
+
+BREAKER_ESTADO = Gauge(
+    "circuit_breaker_estado",
+    "Estado do circuit breaker por upstream (0=fechado, 1=semiaberto, 2=aberto)",
+    ["upstream"],
+)
+BREAKER_REJEICOES = Counter(
+    "circuit_breaker_rejeicoes_total",
+    "Requisições recusadas na hora com o breaker aberto",
+    ["upstream"],
+)
+
+FILA_PROFUNDIDADE = Gauge(
+    "fila_profundidade",
+    "Itens aguardando processamento por fila",
+    ["fila"],
+)
+
+
+@asynccontextmanager
+async def medir_etapa(etapa: str):
+    """
+    Mede a duração da etapa e conta execuções em andamento e exceções
+    """
+    ETAPA_EM_ANDAMENTO.labels(etapa).inc()
+    inicio = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        ETAPA_ERROS.labels(etapa).inc()
+        raise
+    finally:
+        ETAPA_DURACAO.labels(etapa).observe(time.perf_counter() - inicio)
+        ETAPA_EM_ANDAMENTO.labels(etapa).dec()
+
+
+def registrar_fila(nome: str, profundidade: Callable[[], float]):
+    """
+    Expõe a profundidade de uma fila, lida no momento da coleta
+    """
+    FILA_PROFUNDIDADE.labels(nome).set_function(profundidade)
+
+
+def trace_config_upstream(upstream: str) -> aiohttp.TraceConfig:
+    """
+    TraceConfig do aiohttp que registra duração, status e falhas das
+    requisições de uma sessão
+    """
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+
+    async def on_request_start(session, ctx, params):
+        ctx.inicio = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        status = str(params.response.status)
+        UPSTREAM_DURACAO.labels(upstream).observe(time.perf_counter() - ctx.inicio)
+        UPSTREAM_REQUISICOES.labels(upstream, status).inc()
+        if params.response.status >= 400:
+            UPSTREAM_ERROS.labels(upstream, status).inc()
+
+    async def on_request_exception(session, ctx, params):
+        if not hasattr(ctx, "inicio"):
+            # Recusada pelo circuit breaker antes de começar
+            return
+        UPSTREAM_DURACAO.labels(upstream).observe(time.perf_counter() - ctx.inicio)
+        UPSTREAM_REQUISICOES.labels(upstream, "erro").inc()
+        UPSTREAM_ERROS.labels(upstream, "erro").inc()
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
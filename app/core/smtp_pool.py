@@ -0,0 +1,174 @@
+"""
+Envio de emails por SMTP com conexões persistentes.
+
+Um pequeno pool de workers (SMTP_POOL_SIZE) mantém, cada um, uma conexão
+SMTP já autenticada (STARTTLS + login feitos uma única vez). As mensagens
+enfileiradas são agrupadas em lotes de até SMTP_BATCH_SIZE e enviadas numa
+thread, fora do event loop. Se a conexão cair (timeout do servidor,
+reinício, ...), o worker reconecta e tenta a mensagem mais uma vez; uma
+recusa do servidor (destinatário inválido, ...) falha só aquela mensagem
+e a conexão continua em uso.
+"""
+import asyncio
+import logging
+import smtplib
+from email.message import Message
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registrar_fila
+
+logger = logging.getLogger(__name__)
+
+# Recusas de uma mensagem específica: a conexão continua boa (checadas antes
+# de _ERROS_CONEXAO, já que SMTPException é subclasse de OSError)
+_RECUSAS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+# Erros que indicam conexão inutilizável (vale reconectar e tentar de novo)
+_ERROS_CONEXAO = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+class SMTPPool:
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        usuario: Optional[str] = None,
+        senha: Optional[str] = None,
+        starttls: Optional[bool] = None,
+        workers: Optional[int] = None,
+        tamanho_lote: Optional[int] = None,
+    ):
+        self.host = host or settings.SMTP_SERVER
+        self.port = port or settings.SMTP_PORT
+        self.usuario = usuario if usuario is not None else settings.SMTP_USER
+        self.senha = senha if senha is not None else settings.SMTP_PASSWORD
+        self.starttls = settings.SMTP_STARTTLS if starttls is None else starttls
+        self.workers = workers or settings.SMTP_POOL_SIZE
+        self.tamanho_lote = tamanho_lote or settings.SMTP_BATCH_SIZE
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas: List[asyncio.Task] = []
+        # worker -> conexão; cada conexão só é usada pela thread do seu worker
+        self._conexoes: Dict[int, smtplib.SMTP] = {}
+        self.enviados = 0
+        self.falhas = 0
+        self.conexoes_abertas = 0
+
+    # --- Conexão (executado em thread) ------------------------------------
+
+    def _conectar(self) -> smtplib.SMTP:
+        conexao = smtplib.SMTP(self.host, self.port, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if self.starttls:
+                conexao.starttls()
+            if self.senha:
+                conexao.login(self.usuario, self.senha)
+        except BaseException:
+            conexao.close()
+            raise
+        self.conexoes_abertas += 1
+        logger.info(f"Conexão SMTP aberta com {self.host}:{self.port}")
+        return conexao
+
+    def _descartar(self, worker: int):
+        conexao = self._conexoes.pop(worker, None)
+        if conexao is not None:
+            try:
+                conexao.quit()
+            except Exception:
+                conexao.close()
+
+    def _enviar_lote(self, worker: int, mensagens: List[Message]) -> List[bool]:
+        resultados = []
+        for mensagem in mensagens:
+            enviado = False
+            for tentativa in (1, 2):
+                try:
+                    conexao = self._conexoes.get(worker)
+                    if conexao is None:
+                        conexao = self._conexoes[worker] = self._conectar()
+                    conexao.send_message(mensagem)
+                    enviado = True
+                    break
+                except _RECUSAS as e:
+                    # Recusa do servidor para esta mensagem: não adianta reconectar
+                    logger.error(f"Email para {mensagem['To']} recusado: {str(e)}")
+                    break
+                except _ERROS_CONEXAO as e:
+                    self._descartar(worker)
+                    if tentativa == 2:
+                        logger.error(f"Erro de conexão SMTP ao enviar para {mensagem['To']}: {str(e)}")
+            resultados.append(enviado)
+        return resultados
+
+    # --- Workers -------------------------------------------------------------
+
+    def _garantir_workers(self):
+        if self._fila is None:
+            self._fila = asyncio.Queue()
+        self._tarefas = [t for t in self._tarefas if not t.done()]
+        while len(self._tarefas) < self.workers:
+            self._tarefas.append(asyncio.ensure_future(self._worker(len(self._tarefas))))
+
+    async def _worker(self, worker: int):
+        while True:
+            lote: List[Tuple[Message, asyncio.Future]] = [await self._fila.get()]
+            while len(lote) < self.tamanho_lote and not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+            try:
+                resultados = await asyncio.to_thread(self._enviar_lote, worker, [m for m, _ in lote])
+            except asyncio.CancelledError:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_result(False)
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao enviar lote de emails: {str(e)}")
+                resultados = [False] * len(lote)
+            for (_, futuro), enviado in zip(lote, resultados):
+                if enviado:
+                    self.enviados += 1
+                else:
+                    self.falhas += 1
+                if not futuro.done():
+                    futuro.set_result(enviado)
+
+    # --- API ---------------------------------------------------------------
+
+    async def enviar(self, mensagem: Message) -> bool:
+        """
+        Enfileira a mensagem e aguarda o envio. Retorna True se foi aceita pelo servidor.
+        """
+        self._garantir_workers()
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.put_nowait((mensagem, futuro))
+        return await futuro
+
+    async def enviar_varias(self, mensagens: List[Message]) -> List[bool]:
+        return list(await asyncio.gather(*[self.enviar(mensagem) for mensagem in mensagens]))
+
+    def metricas(self) -> Dict[str, int]:
+        return {
+            "enviados": self.enviados,
+            "falhas": self.falhas,
+            "pendentes": self._fila.qsize() if self._fila is not None else 0,
+            "conexoes_abertas": self.conexoes_abertas,
+        }
+
+    async def parar(self):
+        """
+        Encerra os workers e fecha as conexões SMTP
+        """
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        while self._fila is not None and not self._fila.empty():
+            _, futuro = self._fila.get_nowait()
+            if not futuro.done():
+                futuro.set_result(False)
+        for worker in list(self._conexoes):
+            await asyncio.to_thread(self._descartar, worker)
+
+
+smtp_pool = SMTPPool()
+registrar_fila("email", lambda: smtp_pool._fila.qsize() if smtp_pool._fila is not None else 0)
@@ -1,8 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import webhook, financeiro, flexge, gramatica, imagem, voice
+from app.api import webhook, financeiro, flexge, gramatica, imagem, voice, metrics, media
 from app.api.endpoints import whatsapp
+from app.core.http_client import http_clients
+from app.core.logs import configurar_logging
+from app.core.smtp_pool import smtp_pool
+from app.services.flexge_service import flexge_index, explicacoes_gramatica
+from app.services.zaia_poller import zaia_poller
+from app.services.zaia_session_store import zaia_sessions
+from app.services.webhook_queue import webhook_queue
+from app.services.message_dedup import message_dedup
+from app.services.asaas_service import asaas_customer_sync
+from app.services.zapi_dispatcher import zapi_dispatcher
+from app.services.message_coalescer import message_coalescer
 
-app = FastAPI()
+configurar_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_clients.start()
+    flexge_index.iniciar()
+    explicacoes_gramatica.iniciar()
+    asaas_customer_sync.iniciar()
+    await zapi_dispatcher.iniciar()
+    await webhook_queue.iniciar()
+    yield
+    message_coalescer.parar()
+    await webhook_queue.parar()
+    await zapi_dispatcher.parar()
+    await explicacoes_gramatica.parar()
+    await asaas_customer_sync.parar()
+    await flexge_index.parar()
+    await zaia_poller.parar()
+    zaia_sessions.fechar()
+    message_dedup.fechar()
+    explicacoes_gramatica.fechar()
+    await smtp_pool.parar()
+    await http_clients.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(webhook.router, prefix="/api/webhook", tags=["Webhook"])
 app.include_router(financeiro.router, prefix="/api/financeiro", tags=["Financeiro"])
@@ -10,4 +48,6 @@ app.include_router(flexge.router, prefix="/api/flexge", tags=["Flexge"])
 app.include_router(gramatica.router, prefix="/api/gramatica", tags=["Gramatica"])
 app.include_router(imagem.router, prefix="/api/imagem", tags=["Imagem"])
 app.include_router(voice.router, prefix="/api/voice", tags=["Voice"])
-app.include_router(whatsapp.router, prefix="/api/whatsapp", tags=["WhatsApp"]) 
\ No newline at end of file
+app.include_router(whatsapp.router, prefix="/api/whatsapp", tags=["WhatsApp"])
+app.include_router(media.router, prefix="/api/media", tags=["Media"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
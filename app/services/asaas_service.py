@@ -1,19 +1,253 @@
 from app.core.config import settings
-import requests
+from app.core.http_client import http_clients
+from app.utils.cache import TTLCache
+import aiohttp
+import asyncio
+import logging
 from typing import Optional, Dict, List
-from datetime import datetime
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# O ID de cliente do Asaas de um aluno não muda: cache longo, chaveado por
+# ("cpf", dígitos) e ("email", email). "Não encontrado" fica pouco tempo.
+_cache_clientes = TTLCache(
+    maxsize=settings.ASAAS_CUSTOMER_CACHE_MAXSIZE,
+    ttl=settings.ASAAS_CUSTOMER_CACHE_TTL,
+    negative_ttl=settings.ASAAS_CUSTOMER_NEGATIVE_TTL,
+)
+
+# Cobranças por ("todas" | "abertas", customer_id) (estado muda: TTL curto)
+_cache_cobrancas = TTLCache(
+    maxsize=settings.ASAAS_CUSTOMER_CACHE_MAXSIZE,
+    ttl=settings.ASAAS_PAYMENTS_CACHE_TTL,
+)
+
+# Tamanho de página máximo aceito pelo Asaas
+_LIMITE_PAGINA = 100
+
+# Status considerados "em aberto" na busca da próxima cobrança
+STATUS_ABERTOS = ("PENDING", "RECEIVED")
+
+
+class AsaasError(Exception):
+    pass
+
+
+def normalizar_cpf(cpf: Optional[str]) -> str:
+    return ''.join(filter(str.isdigit, cpf or ""))
+
+
+def normalizar_email(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+
+def _headers() -> Dict[str, str]:
+    return {
+        "access_token": settings.ASAAS_API_KEY,
+        "Content-Type": "application/json"
+    }
+
+
+async def asaas_get_json(path: str, params: Optional[Dict] = None) -> Dict:
+    """
+    GET na API do Asaas. Levanta AsaasError em caso de falha, para que
+    erros não sejam confundidos com "não encontrado" (e cacheados).
+    """
+    url = f"{settings.ASAAS_BASE}{path}"
+    try:
+        session = http_clients.session("asaas")
+        async with session.get(url, headers=_headers(), params=params) as resp:
+            if resp.status != 200:
+                raise AsaasError(f"Asaas respondeu {resp.status} para {path}")
+            return await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise AsaasError(f"Falha ao consultar Asaas em {path}: {str(e)}") from e
+
+
+async def asaas_get_todas_paginas(path: str, params: Optional[Dict] = None) -> List[Dict]:
+    """
+    Busca todas as páginas de uma listagem do Asaas (limit/offset).
+    Com totalCount conhecido, as páginas após a primeira são buscadas em paralelo.
+    """
+    params = dict(params or {})
+    params["limit"] = _LIMITE_PAGINA
+    primeira = await asaas_get_json(path, {**params, "offset": 0})
+    itens = list(primeira.get("data", []))
+    if not primeira.get("hasMore"):
+        return itens
+
+    total = primeira.get("totalCount") or 0
+    limite = asyncio.Semaphore(settings.ASAAS_MAX_CONCURRENCY)
+
+    async def pagina(offset: int) -> Dict:
+        async with limite:
+            return await asaas_get_json(path, {**params, "offset": offset})
+
+    if total > _LIMITE_PAGINA:
+        paginas = await asyncio.gather(*[pagina(offset) for offset in range(_LIMITE_PAGINA, total, _LIMITE_PAGINA)])
+        for dados in paginas:
+            itens.extend(dados.get("data", []))
+        return itens
+
+    # Sem totalCount: segue hasMore página a página
+    offset = _LIMITE_PAGINA
+    while True:
+        dados = await pagina(offset)
+        itens.extend(dados.get("data", []))
+        if not dados.get("hasMore") or not dados.get("data"):
+            return itens
+        offset += _LIMITE_PAGINA
+
+
+class CobrancaAsaas:
+    """
+    Cobrança do Asaas com o vencimento já convertido para date
+    """
+    __slots__ = ("id", "valor", "vencimento", "status", "link", "codigo_barras")
+
+    def __init__(self, id: str, valor, vencimento: date, status: str, link: str, codigo_barras: str):
+        self.id = id
+        self.valor = valor
+        self.vencimento = vencimento
+        self.status = status
+        self.link = link
+        self.codigo_barras = codigo_barras
+
+    @classmethod
+    def from_api(cls, payment: Dict) -> "CobrancaAsaas":
+        return cls(
+            payment["id"],
+            payment["value"],
+            date.fromisoformat(payment["dueDate"]),
+            payment["status"],
+            payment.get("invoiceUrl", ""),
+            payment.get("bankSlipUrl", ""),
+        )
+
+    def para_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "valor": self.valor,
+            "vencimento": self.vencimento.isoformat(),
+            "status": self.status,
+            "link": self.link,
+            "codigo_barras": self.codigo_barras,
+        }
+
+
+async def buscar_cobrancas(
+    customer_id: str,
+    status: Optional[str] = None,
+    vencimento_de: Optional[date] = None,
+    vencimento_ate: Optional[date] = None,
+) -> List[CobrancaAsaas]:
+    """
+    Busca as cobranças do cliente com os filtros aplicados pelo próprio
+    Asaas, seguindo todas as páginas
+    """
+    params: Dict[str, str] = {"customer": customer_id}
+    if status:
+        params["status"] = status
+    if vencimento_de:
+        params["dueDate[ge]"] = vencimento_de.isoformat()
+    if vencimento_ate:
+        params["dueDate[le]"] = vencimento_ate.isoformat()
+    payments = await asaas_get_todas_paginas("/payments", params)
+    return [CobrancaAsaas.from_api(payment) for payment in payments]
+
+
+def _indexar_cliente(customer: Dict, ttl: Optional[float] = None):
+    cpf = normalizar_cpf(customer.get("cpfCnpj"))
+    email = normalizar_email(customer.get("email"))
+    if cpf:
+        _cache_clientes.set(("cpf", cpf), customer["id"], ttl=ttl)
+    if email:
+        _cache_clientes.set(("email", email), customer["id"], ttl=ttl)
+
+
+async def sincronizar_clientes() -> int:
+    """
+    Percorre /customers uma vez (páginas em paralelo, após a primeira) e
+    preenche o cache de IDs por CPF e email. Retorna o total indexado.
+    """
+    inicio = asyncio.get_running_loop().time()
+    clientes = await asaas_get_todas_paginas("/customers")
+
+    # Em CPFs/emails repetidos vale o primeiro cliente, como na busca individual
+    for customer in reversed(clientes):
+        if not customer.get("deleted") and customer.get("id"):
+            _indexar_cliente(customer)
+    logger.info(f"Clientes do Asaas sincronizados: {len(clientes)} em {asyncio.get_running_loop().time() - inicio:.2f}s")
+    return len(clientes)
+
+
+class AsaasCustomerSync:
+    """
+    Sincronização periódica opcional (ASAAS_CUSTOMER_SYNC_ENABLED) do índice de clientes
+    """
+
+    def __init__(self):
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await sincronizar_clientes()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar clientes do Asaas: {str(e)}")
+            await asyncio.sleep(settings.ASAAS_CUSTOMER_SYNC_INTERVAL)
+
+    def iniciar(self):
+        if not settings.ASAAS_CUSTOMER_SYNC_ENABLED:
+            return
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.ensure_future(self._loop())
+
+    async def parar(self):
+        tarefa, self._tarefa = self._tarefa, None
+        if tarefa is not None and not tarefa.done():
+            tarefa.cancel()
+            try:
+                await tarefa
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+asaas_customer_sync = AsaasCustomerSync()
+
 
 class AsaasService:
     def __init__(self):
         self.api_key = settings.ASAAS_API_KEY
         self.base_url = settings.ASAAS_BASE
-        
+
     def _get_headers(self):
-        return {
-            "access_token": self.api_key,
-            "Content-Type": "application/json"
-        }
-        
+        return _headers()
+
+    @staticmethod
+    def invalidar_cache(customer_id: Optional[str] = None, cpf: Optional[str] = None, email: Optional[str] = None):
+        """
+        Remove do cache as cobranças do cliente e/ou o mapeamento CPF/email -> cliente
+        """
+        if customer_id:
+            _cache_cobrancas.invalidate(("todas", customer_id))
+            _cache_cobrancas.invalidate(("abertas", customer_id))
+        if cpf:
+            _cache_clientes.invalidate(("cpf", normalizar_cpf(cpf)))
+        if email:
+            _cache_clientes.invalidate(("email", normalizar_email(email)))
+
+    async def _carregar_cliente(self, campo: str, valor: str) -> Optional[str]:
+        data = await asaas_get_json("/customers", {campo: valor})
+        if data.get("data"):
+            customer = data["data"][0]
+            _indexar_cliente(customer)
+            return customer["id"]
+        return None
+
     async def buscar_cliente(self, aluno: Dict) -> Optional[str]:
         """
         Busca um cliente no Asaas usando CPF ou email
@@ -21,64 +255,50 @@ class AsaasService:
         """
         try:
             # Tentar buscar por CPF primeiro
-            if aluno.get("cpf"):
-                cpf = ''.join(filter(str.isdigit, aluno["cpf"]))
-                url = f"{self.base_url}/customers?cpfCnpj={cpf}"
-                resp = requests.get(url, headers=self._get_headers())
-                resp.raise_for_status()
-                data = resp.json()
-                
-                if data.get("data"):
-                    return data["data"][0]["id"]
-            
+            cpf = normalizar_cpf(aluno.get("cpf"))
+            if cpf:
+                customer_id = await _cache_clientes.get_or_load(
+                    ("cpf", cpf), lambda: self._carregar_cliente("cpfCnpj", cpf)
+                )
+                if customer_id:
+                    return customer_id
+
             # Se não encontrou por CPF, tentar por email
-            if aluno.get("email"):
-                url = f"{self.base_url}/customers?email={aluno['email']}"
-                resp = requests.get(url, headers=self._get_headers())
-                resp.raise_for_status()
-                data = resp.json()
-                
-                if data.get("data"):
-                    return data["data"][0]["id"]
-            
+            email = normalizar_email(aluno.get("email"))
+            if email:
+                return await _cache_clientes.get_or_load(
+                    ("email", email), lambda: self._carregar_cliente("email", email)
+                )
+
             return None
-            
+
         except Exception as e:
-            print(f"Erro ao buscar cliente no Asaas: {str(e)}")
+            logger.error(f"Erro ao buscar cliente no Asaas: {str(e)}")
             return None
-            
+
     async def buscar_cobrancas_por_customer_id(self, customer_id: str) -> Optional[List[Dict]]:
         """
-        Busca cobranças de um cliente pelo ID
+        Busca todas as cobranças de um cliente pelo ID (cacheadas por ASAAS_PAYMENTS_CACHE_TTL)
         """
         try:
-            url_payments = f"{self.base_url}/payments?customer={customer_id}"
-            resp_payments = requests.get(
-                url_payments,
-                headers=self._get_headers()
+            cobrancas = await _cache_cobrancas.get_or_load(
+                ("todas", customer_id), lambda: buscar_cobrancas(customer_id)
             )
-            resp_payments.raise_for_status()
-            
-            data_payments = resp_payments.json()
-            
-            # Formatar as cobranças
-            cobrancas = []
-            for payment in data_payments.get("data", []):
-                cobrancas.append({
-                    "id": payment["id"],
-                    "valor": payment["value"],
-                    "vencimento": payment["dueDate"],
-                    "status": payment["status"],
-                    "link": payment.get("invoiceUrl", ""),
-                    "codigo_barras": payment.get("bankSlipUrl", "")
-                })
-                
-            return cobrancas
-            
+            return [c.para_dict() for c in cobrancas]
+
         except Exception as e:
-            print(f"Erro ao buscar cobranças no Asaas: {str(e)}")
+            logger.error(f"Erro ao buscar cobranças no Asaas: {str(e)}")
             return None
-            
+
+    async def _carregar_cobrancas_abertas(self, customer_id: str) -> List[CobrancaAsaas]:
+        # O Asaas filtra um status por vez: os status em aberto são buscados em paralelo
+        hoje = date.today()
+        por_status = await asyncio.gather(*[
+            buscar_cobrancas(customer_id, status=status, vencimento_de=hoje)
+            for status in STATUS_ABERTOS
+        ])
+        return [cobranca for cobrancas in por_status for cobranca in cobrancas]
+
     async def buscar_proxima_cobranca(self, aluno: Dict) -> Optional[Dict]:
         """
         Busca a próxima cobrança em aberto do cliente
@@ -89,28 +309,21 @@ class AsaasService:
             customer_id = await self.buscar_cliente(aluno)
             if not customer_id:
                 return None
-                
-            # Buscar cobranças do cliente
-            cobrancas = await self.buscar_cobrancas_por_customer_id(customer_id)
-            if not cobrancas:
-                return None
-                
-            # Filtrar cobranças em aberto e ordenar por data de vencimento
-            cobrancas_abertas = [
-                c for c in cobrancas 
-                if c["status"] in ["PENDING", "RECEIVED"] and 
-                datetime.strptime(c["vencimento"], "%Y-%m-%d") >= datetime.now()
-            ]
-            
+
+            # Cobranças em aberto a vencer, já filtradas pelo Asaas
+            cobrancas = await _cache_cobrancas.get_or_load(
+                ("abertas", customer_id), lambda: self._carregar_cobrancas_abertas(customer_id)
+            )
+
+            # O cache pode ter atravessado a meia-noite
+            hoje = date.today()
+            cobrancas_abertas = [c for c in cobrancas if c.vencimento >= hoje]
             if not cobrancas_abertas:
                 return None
-                
+
             # Retornar a cobrança mais próxima
-            return min(
-                cobrancas_abertas,
-                key=lambda x: datetime.strptime(x["vencimento"], "%Y-%m-%d")
-            )
-            
+            return min(cobrancas_abertas, key=lambda c: c.vencimento).para_dict()
+
         except Exception as e:
-            print(f"Erro ao buscar próxima cobrança no Asaas: {str(e)}")
-            return None 
\ No newline at end of file
+            logger.error(f"Erro ao buscar próxima cobrança no Asaas: {str(e)}")
+            return None
@@ -1,39 +1,47 @@
 from app.core.config import settings
-import smtplib
+from app.core.smtp_pool import smtp_pool
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from html import escape
+from string import Template
+from typing import List, Tuple
 
-class EmailService:
-    def __init__(self):
-        self.smtp_server = settings.SMTP_SERVER
-        self.smtp_port = settings.SMTP_PORT
-        self.smtp_user = settings.SMTP_USER
-        self.smtp_password = settings.SMTP_PASSWORD
+ASSUNTO_INATIVIDADE = "Aviso: seu acesso ao Flexge será bloqueado"
 
-    async def send_inactivity_email(self, recipient: str, first_name: str):
-        subject = "Aviso: seu acesso ao Flexge será bloqueado"
-        html = f"""
+# Template compilado uma vez; só o primeiro nome varia por aluno
+TEMPLATE_INATIVIDADE = Template("""
         <html><body style='font-family:Montserrat;'>
-        <h2 style='color:#113842;'>Hello Hello {first_name}!</h2>
+        <h2 style='color:#113842;'>Hello Hello $first_name!</h2>
         <p>Notamos que você não acessa o Flexge há alguns dias.</p>
         <p>Seu acesso será <strong>bloqueado em dois dias</strong>. Por favor, entre no app e evite isso.</p>
         <p style='margin-top:30px;'>Equipe Karol Elói Language Learning</p>
         </body></html>
-        """
-        
+        """)
+
+class EmailService:
+    def __init__(self):
+        self.smtp_user = settings.SMTP_USER
+
+    def montar_email_inatividade(self, recipient: str, first_name: str) -> MIMEMultipart:
         msg = MIMEMultipart()
         msg['From'] = self.smtp_user
         msg['To'] = recipient
-        msg['Subject'] = subject
-        msg.attach(MIMEText(html, 'html'))
-        
-        try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_user, self.smtp_password)
-            server.send_message(msg)
-            server.quit()
-            return True
-        except Exception as e:
-            print("Erro ao enviar email:", e)
-            return False 
\ No newline at end of file
+        msg['Subject'] = ASSUNTO_INATIVIDADE
+        msg.attach(MIMEText(TEMPLATE_INATIVIDADE.substitute(first_name=escape(first_name)), 'html'))
+        return msg
+
+    async def send_inactivity_email(self, recipient: str, first_name: str) -> bool:
+        """
+        Envia o aviso de inatividade pela conexão SMTP persistente
+        """
+        return await smtp_pool.enviar(self.montar_email_inatividade(recipient, first_name))
+
+    async def send_inactivity_emails(self, destinatarios: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Envia os avisos de inatividade de uma vez (agrupados em lotes pelo pool SMTP).
+        destinatarios: lista de (email, primeiro_nome)
+        """
+        return await smtp_pool.enviar_varias([
+            self.montar_email_inatividade(recipient, first_name)
+            for recipient, first_name in destinatarios
+        ])
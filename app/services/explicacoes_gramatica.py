@@ -0,0 +1,289 @@
+"""
+Biblioteca de explicações de gramática geradas pelo GPT.
+
+Os tópicos (nomes de gramática do Flexge, "Mastery Test <nível>", ...) são
+poucos e compartilhados por todos os alunos, então cada explicação é
+gerada uma única vez por (tópico, versão do prompt) e guardada no SQLite
+de DATABASE_URL, com um cache em memória na frente. Mudar o prompt ou o
+modelo exige trocar PROMPT_VERSAO, o que invalida a biblioteca inteira.
+
+Um job de aquecimento percorre periodicamente os tópicos conhecidos
+(fornecidos por buscar_topicos) e gera antes as explicações que faltam.
+Com vários workers do uvicorn, cada rodada é reservada no SQLite
+(tabela aquecimento_explicacoes, por versão): só o worker que reserva a
+rodada consulta os tópicos, os demais pulam até o próximo intervalo.
+Uma rodada que falha devolve a reserva para nova tentativa após
+EXPLICACAO_WARMUP_RETRY segundos.
+Falhas de geração não são gravadas: o chamador recebe o texto de
+indisponibilidade e a próxima requisição tenta de novo.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.database import SQLiteConnection, sqlite_path
+from app.core.http_client import http_clients
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MODELO = "gpt-4"
+PROMPT_VERSAO = f"{MODELO}/v1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS explicacoes_gramatica (
+    topico TEXT NOT NULL,
+    versao TEXT NOT NULL,
+    explicacao TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (topico, versao)
+);
+CREATE TABLE IF NOT EXISTS aquecimento_explicacoes (
+    versao TEXT PRIMARY KEY,
+    executado_em REAL NOT NULL
+);
+"""
+
+
+def texto_indisponivel(topico: str) -> str:
+    return f"Explicação sobre {topico} não disponível no momento. Por favor tente mais tarde."
+
+
+async def gerar_explicacao(topico: str) -> str:
+    """
+    Gera a explicação do tópico com o GPT (levanta exceção em caso de falha)
+    """
+    prompt = f"""
+        Crie uma explicação completa sobre '{topico}' com:
+        - 1 definição simples
+        - 3 exemplos bilíngues (EN → PT)
+        - 2 dicas práticas
+        Formato: Texto simples com no máximo 5 linhas"""
+
+    resp = await http_clients.openai().chat.completions.create(
+        model=MODELO,
+        messages=[
+            {"role": "system", "content": "Você é um professor de inglês direto e prático, que ensina alunos com TDAH"},
+            {"role": "user", "content": prompt}
+        ],
+        timeout=settings.EXPLICACAO_TIMEOUT,
+    )
+    return resp.choices[0].message.content
+
+
+class BibliotecaExplicacoes:
+    def __init__(
+        self,
+        buscar_topicos: Optional[Callable[[], Awaitable[Iterable[str]]]] = None,
+        gerar: Callable[[str], Awaitable[str]] = gerar_explicacao,
+        database_url: Optional[str] = None,
+        versao: str = PROMPT_VERSAO,
+    ):
+        self._buscar_topicos = buscar_topicos
+        self._gerar = gerar
+        self.versao = versao
+        path = sqlite_path(database_url)
+        self._db: Optional[SQLiteConnection] = SQLiteConnection(path) if path else None
+        self._schema_criado = False
+        self._memoria = TTLCache(maxsize=settings.EXPLICACAO_CACHE_MAXSIZE, ttl=settings.EXPLICACAO_CACHE_TTL)
+        self._limite = asyncio.Semaphore(settings.EXPLICACAO_MAX_CONCURRENCY)
+        self._tarefa_aquecimento: Optional[asyncio.Task] = None
+        self.geradas = 0
+        self.falhas = 0
+
+    # --- SQLite (executado em thread) -------------------------------------
+
+    def _garantir_schema(self):
+        if not self._schema_criado:
+            self._db.executescript(_SCHEMA)
+            self._schema_criado = True
+
+    def _ler_sqlite(self, topico: str) -> Optional[str]:
+        self._garantir_schema()
+        rows = self._db.execute(
+            "SELECT explicacao FROM explicacoes_gramatica WHERE topico = ? AND versao = ?",
+            (topico, self.versao),
+        )
+        return rows[0][0] if rows else None
+
+    def _gravar_sqlite(self, topico: str, explicacao: str):
+        self._garantir_schema()
+        self._db.execute(
+            "INSERT OR REPLACE INTO explicacoes_gramatica (topico, versao, explicacao, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (topico, self.versao, explicacao, time.time()),
+        )
+
+    def _existentes_sqlite(self) -> set:
+        self._garantir_schema()
+        rows = self._db.execute(
+            "SELECT topico FROM explicacoes_gramatica WHERE versao = ?",
+            (self.versao,),
+        )
+        return {row[0] for row in rows}
+
+    def _reservar_aquecimento_sqlite(self, agora: float, intervalo: float) -> bool:
+        self._garantir_schema()
+        # Só um worker por intervalo consegue gravar a rodada da versão
+        alteradas = self._db.execute_rowcount(
+            "INSERT INTO aquecimento_explicacoes (versao, executado_em) VALUES (?, ?) "
+            "ON CONFLICT(versao) DO UPDATE SET executado_em = excluded.executado_em "
+            "WHERE aquecimento_explicacoes.executado_em <= ?",
+            (self.versao, agora, agora - intervalo),
+        )
+        return alteradas > 0
+
+    def _liberar_aquecimento_sqlite(self, agora: float, intervalo: float, nova_tentativa: float):
+        self._garantir_schema()
+        # Antecipa a próxima reserva: qualquer worker pode tentar após nova_tentativa
+        self._db.execute(
+            "UPDATE aquecimento_explicacoes SET executado_em = ? WHERE versao = ?",
+            (agora - intervalo + nova_tentativa, self.versao),
+        )
+
+    # --- Carga -------------------------------------------------------------
+
+    async def _carregar(self, topico: str) -> str:
+        if self._db is not None:
+            try:
+                explicacao = await asyncio.to_thread(self._ler_sqlite, topico)
+                if explicacao:
+                    return explicacao
+            except Exception as e:
+                logger.error(f"Erro ao ler explicação no SQLite: {str(e)}")
+
+        async with self._limite:
+            explicacao = await self._gerar(topico)
+        if not explicacao:
+            raise ValueError("Resposta vazia do GPT")
+        self.geradas += 1
+        logger.info(f"Explicação gerada para o tópico '{topico}'")
+
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._gravar_sqlite, topico, explicacao)
+            except Exception as e:
+                logger.error(f"Erro ao gravar explicação no SQLite: {str(e)}")
+        return explicacao
+
+    # --- API ---------------------------------------------------------------
+
+    async def obter(self, topico: str) -> str:
+        """
+        Retorna a explicação do tópico, gerando-a apenas se ainda não existir
+        """
+        try:
+            return await self._memoria.get_or_load(topico, lambda: self._carregar(topico))
+        except Exception as e:
+            self.falhas += 1
+            logger.error(f"Erro ao gerar explicação para '{topico}': {str(e)}")
+            return texto_indisponivel(topico)
+
+    async def obter_varias(self, topicos: List[str]) -> List[str]:
+        """
+        Retorna as explicações na ordem dos tópicos, gerando as que faltam em paralelo
+        """
+        return list(await asyncio.gather(*[self.obter(topico) for topico in topicos]))
+
+    async def aquecer(self, topicos: Optional[Iterable[str]] = None) -> int:
+        """
+        Gera as explicações que ainda não existem para os tópicos informados
+        (ou para os de buscar_topicos). Retorna quantas foram geradas.
+        """
+        if topicos is None:
+            if self._buscar_topicos is None:
+                return 0
+            topicos = await self._buscar_topicos()
+        topicos = {topico for topico in topicos if topico}
+
+        existentes: set = set()
+        if self._db is not None:
+            try:
+                existentes = await asyncio.to_thread(self._existentes_sqlite)
+            except Exception as e:
+                logger.error(f"Erro ao listar explicações no SQLite: {str(e)}")
+        faltantes = sorted(topicos - existentes)
+        if not faltantes:
+            logger.info(f"Aquecimento de explicações: {len(topicos)} tópicos, todos já gerados")
+            return 0
+
+        antes = self.geradas
+        await self.obter_varias(faltantes)
+        geradas = self.geradas - antes
+        logger.info(f"Aquecimento de explicações: {len(topicos)} tópicos, {geradas} gerados")
+        return geradas
+
+    async def _reservar_aquecimento(self) -> bool:
+        """
+        Reserva a rodada de aquecimento para este worker; False se outro
+        worker já aqueceu esta versão dentro de EXPLICACAO_WARMUP_INTERVAL
+        """
+        if self._db is None:
+            return True
+        try:
+            return await asyncio.to_thread(
+                self._reservar_aquecimento_sqlite, time.time(), settings.EXPLICACAO_WARMUP_INTERVAL
+            )
+        except Exception as e:
+            logger.error(f"Erro ao reservar aquecimento de explicações no SQLite: {str(e)}")
+            return False
+
+    async def _liberar_aquecimento(self):
+        """
+        Devolve a reserva de uma rodada que falhou, para que seja repetida
+        após EXPLICACAO_WARMUP_RETRY em vez de só no próximo intervalo
+        """
+        if self._db is None:
+            return
+        try:
+            await asyncio.to_thread(
+                self._liberar_aquecimento_sqlite,
+                time.time(), settings.EXPLICACAO_WARMUP_INTERVAL, settings.EXPLICACAO_WARMUP_RETRY,
+            )
+        except Exception as e:
+            logger.error(f"Erro ao liberar aquecimento de explicações no SQLite: {str(e)}")
+
+    async def _loop_aquecimento(self):
+        while True:
+            espera = settings.EXPLICACAO_WARMUP_INTERVAL
+            if await self._reservar_aquecimento():
+                falhas = self.falhas
+                try:
+                    await self.aquecer()
+                    concluido = self.falhas == falhas
+                except asyncio.CancelledError:
+                    await self._liberar_aquecimento()
+                    raise
+                except Exception as e:
+                    logger.error(f"Erro no aquecimento de explicações: {str(e)}")
+                    concluido = False
+                if not concluido:
+                    await self._liberar_aquecimento()
+                    espera = settings.EXPLICACAO_WARMUP_RETRY
+            else:
+                logger.info("Aquecimento de explicações já feito por outro worker; pulando")
+            await asyncio.sleep(espera)
+
+    def iniciar(self):
+        """
+        Inicia o aquecimento periódico em background
+        """
+        if not settings.EXPLICACAO_WARMUP_ENABLED:
+            return
+        if self._tarefa_aquecimento is None or self._tarefa_aquecimento.done():
+            self._tarefa_aquecimento = asyncio.ensure_future(self._loop_aquecimento())
+
+    async def parar(self):
+        tarefa, self._tarefa_aquecimento = self._tarefa_aquecimento, None
+        if tarefa is not None and not tarefa.done():
+            tarefa.cancel()
+            try:
+                await tarefa
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def fechar(self):
+        if self._db is not None:
+            self._db.close()
@@ -0,0 +1,201 @@
+"""
+Índice em memória dos alunos do Flexge (email -> aluno).
+
+O roster é carregado buscando as páginas de /students em paralelo (com
+limite de concorrência) e atualizado periodicamente em background, de
+forma incremental: cada página recebida já atualiza o índice e, ao fim
+de uma passada completa, os alunos que sumiram do Flexge são removidos.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AlunoFlexge:
+    """
+    Registro compacto de um aluno do Flexge
+    """
+    __slots__ = ("id", "name", "email", "level", "enabled", "last_access")
+
+    def __init__(self, id: str, name: str, email: str, level, enabled: bool, last_access: str):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.level = level
+        self.enabled = enabled
+        self.last_access = last_access
+
+    @classmethod
+    def from_api(cls, student: Dict) -> "AlunoFlexge":
+        return cls(
+            student["_id"],
+            student.get("name", ""),
+            student.get("email", ""),
+            student.get("level", ""),
+            student.get("enabled", True),
+            student.get("lastAccess", ""),
+        )
+
+    def para_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "email": self.email,
+            "level": self.level,
+            "enabled": self.enabled,
+            "lastAccess": self.last_access,
+        }
+
+
+class FlexgeStudentIndex:
+    """
+    Índice email -> AlunoFlexge com atualização em background
+    """
+
+    def __init__(self, buscar_pagina: Callable[[int], Awaitable[Optional[Dict]]]):
+        self._buscar_pagina = buscar_pagina
+        self._por_email: Dict[str, AlunoFlexge] = {}
+        self._atualizacao: Optional[asyncio.Task] = None
+        self._tarefa_background: Optional[asyncio.Task] = None
+        self.atualizado_em: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._por_email)
+
+    @property
+    def pronto(self) -> bool:
+        return self.atualizado_em is not None
+
+    def _indexar(self, docs: Iterable[Dict], vistos: set):
+        for student in docs:
+            email = (student.get("email") or "").lower()
+            if not email or "_id" not in student:
+                continue
+            self._por_email[email] = AlunoFlexge.from_api(student)
+            vistos.add(email)
+
+    async def _passada_completa(self) -> Tuple[bool, Optional[float]]:
+        """
+        Percorre o roster. Retorna (completa, atualizado_em): atualizado_em
+        só avança quando todas as páginas foram recebidas.
+        """
+        inicio = time.monotonic()
+        vistos: set = set()
+        limite = asyncio.Semaphore(settings.FLEXGE_INDEX_CONCURRENCY)
+
+        async def buscar(page: int) -> Optional[Dict]:
+            async with limite:
+                return await self._buscar_pagina(page)
+
+        primeira = await buscar(1)
+        if not primeira or not primeira.get("docs"):
+            logger.warning("Índice Flexge: primeira página vazia ou indisponível")
+            return False, self.atualizado_em
+        self._indexar(primeira["docs"], vistos)
+
+        total_paginas = primeira.get("totalPages") or primeira.get("pages")
+        completa = True
+        if total_paginas:
+            # Total conhecido: busca todas as páginas restantes de uma vez
+            paginas = await asyncio.gather(*[buscar(p) for p in range(2, int(total_paginas) + 1)])
+            for dados in paginas:
+                if dados is None:
+                    completa = False
+                elif dados.get("docs"):
+                    self._indexar(dados["docs"], vistos)
+        elif primeira.get("hasNextPage", False):
+            # Total desconhecido: busca em lotes até a última página
+            proxima = 2
+            while True:
+                lote = list(range(proxima, proxima + settings.FLEXGE_INDEX_CONCURRENCY))
+                paginas = await asyncio.gather(*[buscar(p) for p in lote])
+                fim = False
+                for dados in paginas:
+                    if dados is None:
+                        completa = False
+                        fim = True
+                        break
+                    if not dados.get("docs"):
+                        fim = True
+                        break
+                    self._indexar(dados["docs"], vistos)
+                    if not dados.get("hasNextPage", False):
+                        fim = True
+                        break
+                if fim:
+                    break
+                proxima += len(lote)
+
+        if not completa:
+            logger.warning("Índice Flexge: passada incompleta, alunos antigos mantidos")
+            return False, self.atualizado_em
+
+        # Remove alunos que não existem mais no Flexge
+        for email in list(self._por_email):
+            if email not in vistos:
+                del self._por_email[email]
+        self.atualizado_em = time.monotonic()
+        logger.info(f"Índice Flexge atualizado: {len(self._por_email)} alunos em {self.atualizado_em - inicio:.2f}s")
+        return True, self.atualizado_em
+
+    async def atualizar(self) -> Tuple[bool, Optional[float]]:
+        """
+        Executa (ou aguarda) uma passada completa pelo roster.
+        Retorna (completa, atualizado_em) da passada.
+        """
+        if self._atualizacao is None or self._atualizacao.done():
+            self._atualizacao = asyncio.ensure_future(self._passada_completa())
+        return await asyncio.shield(self._atualizacao)
+
+    async def buscar_por_email(self, email: str) -> Optional[AlunoFlexge]:
+        """
+        Busca um aluno pelo email em O(1).
+        Em caso de ausência, força uma atualização se o índice estiver
+        mais velho que FLEXGE_INDEX_MISS_REFRESH (aluno recém-cadastrado).
+        """
+        email = (email or "").lower()
+        aluno = self._por_email.get(email)
+        if aluno is not None:
+            return aluno
+
+        idade = time.monotonic() - self.atualizado_em if self.pronto else None
+        if idade is None or idade > settings.FLEXGE_INDEX_MISS_REFRESH:
+            await self.atualizar()
+            return self._por_email.get(email)
+        return None
+
+    def alunos(self) -> List[AlunoFlexge]:
+        return list(self._por_email.values())
+
+    async def _loop_background(self):
+        while True:
+            try:
+                await self.atualizar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao atualizar índice Flexge: {str(e)}")
+            await asyncio.sleep(settings.FLEXGE_INDEX_REFRESH_INTERVAL)
+
+    def iniciar(self):
+        """
+        Inicia a atualização periódica em background
+        """
+        if self._tarefa_background is None or self._tarefa_background.done():
+            self._tarefa_background = asyncio.ensure_future(self._loop_background())
+
+    async def parar(self):
+        for tarefa in (self._tarefa_background, self._atualizacao):
+            if tarefa is not None and not tarefa.done():
+                tarefa.cancel()
+                try:
+                    await tarefa
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._tarefa_background = None
+        self._atualizacao = None
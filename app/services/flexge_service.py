@@ -1,15 +1,177 @@
-import requests
 from app.core.config import settings
+from app.core.http_client import http_clients
 import time
-from openai import OpenAI
 import json
+import asyncio
+import logging
+import aiohttp
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from app.services.notion_service import NotionService
+from app.services.flexge_index import AlunoFlexge, FlexgeStudentIndex
+from app.services.explicacoes_gramatica import BibliotecaExplicacoes
+
+logger = logging.getLogger(__name__)
+
+# Limite de requisições simultâneas ao host do Flexge
+_limite_flexge = asyncio.Semaphore(settings.FLEXGE_MAX_CONCURRENCY)
+
+async def flexge_get_json(path: str) -> Optional[Any]:
+    """
+    GET no Flexge respeitando o limite de concorrência.
+    Retorna o JSON da resposta ou None em caso de falha (status != 200,
+    erro de rede ou timeout), para que fan-outs tolerem falhas parciais.
+    """
+    url = f"{settings.FLEXGE_API_BASE}{path}"
+    try:
+        async with _limite_flexge:
+            session = http_clients.session("flexge")
+            async with session.get(url, headers=generate_headers()) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Flexge respondeu {resp.status} para {path}")
+                    return None
+                return await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Falha ao consultar Flexge em {path}: {str(e)}")
+        return None
+
+async def buscar_pagina_students(page: int) -> Optional[Dict]:
+    """
+    Busca uma página de /students no Flexge
+    """
+    return await flexge_get_json(f"/students?page={page}")
+
+async def buscar_execucoes_mastery(student_id: str, mastery_tests: List[Dict]) -> List[Tuple[Dict, Dict, List[Dict]]]:
+    """
+    Busca execuções e respostas de vários mastery tests em paralelo.
+    Cada teste busca suas execuções e, em seguida, os itens de todas elas
+    ao mesmo tempo. Falhas individuais são ignoradas e o resultado mantém
+    a ordem dos testes e das execuções.
+    Retorna uma lista de (test, execucao, respostas).
+    """
+    async def por_teste(test: Dict) -> List[Tuple[Dict, Dict, List[Dict]]]:
+        base = f"/students/{student_id}/mastery-tests/{test['_id']}/executions"
+        execucoes = await flexge_get_json(base)
+        if not execucoes:
+            return []
+        itens = await asyncio.gather(*[
+            flexge_get_json(f"{base}/{execucao['_id']}/items") for execucao in execucoes
+        ])
+        return [
+            (test, execucao, respostas)
+            for execucao, respostas in zip(execucoes, itens)
+            if respostas is not None
+        ]
+
+    por_testes = await asyncio.gather(*[por_teste(test) for test in mastery_tests])
+    return [resultado for resultados in por_testes for resultado in resultados]
+
+# Índice email -> aluno, atualizado em background (ver app/main.py)
+flexge_index = FlexgeStudentIndex(buscar_pagina_students)
+
+# Dias sem acesso para bloquear / avisar o aluno
+DIAS_INATIVIDADE_BLOQUEIO = 10
+DIAS_INATIVIDADE_AVISO = 8
+
+def classificar_inatividade(alunos: Iterable[AlunoFlexge], agora: datetime) -> Tuple[List[AlunoFlexge], List[AlunoFlexge]]:
+    """
+    Separa os alunos ativos no Flexge em (bloquear, avisar) numa única
+    passada, comparando lastAccess com os dois cortes calculados uma vez.
+    Alunos já desabilitados ou sem lastAccess são ignorados.
+    """
+    corte_bloqueio = agora - timedelta(days=DIAS_INATIVIDADE_BLOQUEIO)
+    corte_aviso = agora - timedelta(days=DIAS_INATIVIDADE_AVISO)
+    bloquear: List[AlunoFlexge] = []
+    avisar: List[AlunoFlexge] = []
+    for aluno in alunos:
+        if aluno.enabled is False or not aluno.last_access:
+            continue
+        try:
+            ultimo_acesso = datetime.fromisoformat(aluno.last_access.replace("Z", "+00:00"))
+        except ValueError:
+            logger.warning(f"lastAccess inválido para o aluno {aluno.id}: {aluno.last_access}")
+            continue
+        if ultimo_acesso.tzinfo is None:
+            # Sem fuso: o Flexge usa UTC
+            ultimo_acesso = ultimo_acesso.replace(tzinfo=timezone.utc)
+        if ultimo_acesso <= corte_bloqueio:
+            bloquear.append(aluno)
+        elif ultimo_acesso <= corte_aviso:
+            avisar.append(aluno)
+    return bloquear, avisar
+
+async def patch_students_action_lote(student_ids: List[str], action: str) -> bool:
+    """
+    PATCH /students/{action} para vários alunos numa única requisição
+    """
+    url = f"{settings.FLEXGE_API_BASE}/students/{action}"
+    try:
+        async with _limite_flexge:
+            session = http_clients.session("flexge")
+            async with session.patch(url, headers=generate_headers(), json={"students": student_ids}) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Flexge respondeu {resp.status} ao aplicar '{action}' em {len(student_ids)} alunos")
+                    return False
+                return True
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Falha ao aplicar '{action}' em {len(student_ids)} alunos: {str(e)}")
+        return False
+
+async def aplicar_acao_em_lotes(student_ids: List[str], action: str) -> Tuple[List[str], List[str]]:
+    """
+    Aplica a ação em lotes de FLEXGE_BULK_CHUNK_SIZE alunos, com os lotes em paralelo.
+    Retorna (ids_com_sucesso, ids_com_falha).
+    """
+    tamanho = settings.FLEXGE_BULK_CHUNK_SIZE
+    lotes = [student_ids[i:i + tamanho] for i in range(0, len(student_ids), tamanho)]
+    resultados = await asyncio.gather(*[patch_students_action_lote(lote, action) for lote in lotes])
+    sucesso: List[str] = []
+    falha: List[str] = []
+    for lote, ok in zip(lotes, resultados):
+        (sucesso if ok else falha).extend(lote)
+    return sucesso, falha
+
+async def buscar_studied_grammars(student_id: str) -> Optional[List[Dict]]:
+    """
+    Busca as gramáticas estudadas (com percentual de erro) do aluno
+    """
+    return await flexge_get_json(f"/students/{student_id}/studied-grammars?page=1")
+
+async def listar_topicos_gramatica() -> List[str]:
+    """
+    Coleta os nomes de gramática que aparecem em studied-grammars de todos
+    os alunos do índice (usado no aquecimento das explicações). Usa no
+    máximo EXPLICACAO_WARMUP_CONCURRENCY das vagas de _limite_flexge, para
+    não atrasar as consultas feitas para os alunos.
+    """
+    if not flexge_index.pronto:
+        await flexge_index.atualizar()
+    alunos = flexge_index.alunos()
+    if not alunos:
+        raise RuntimeError("Índice de alunos do Flexge indisponível")
+    topicos = set()
+    limite = asyncio.Semaphore(settings.EXPLICACAO_WARMUP_CONCURRENCY)
+
+    async def buscar(student_id: str) -> Optional[List[Dict]]:
+        async with limite:
+            return await buscar_studied_grammars(student_id)
+
+    lote = settings.EXPLICACAO_WARMUP_CONCURRENCY * 10
+    for i in range(0, len(alunos), lote):
+        grammars = await asyncio.gather(*[buscar(aluno.id) for aluno in alunos[i:i + lote]])
+        for lista in grammars:
+            for grammar in lista or []:
+                if isinstance(grammar, dict) and grammar.get("name"):
+                    topicos.add(grammar["name"])
+    return sorted(topicos)
+
+# Explicações por tópico, persistidas e aquecidas em background (ver app/main.py)
+explicacoes_gramatica = BibliotecaExplicacoes(listar_topicos_gramatica)
 
 class FlexgeService:
     def __init__(self):
         self.base_url = settings.FLEXGE_API_BASE
         self.api_key = settings.FLEXGE_API_KEY
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
         self.notion_service = NotionService()
     
     def generate_headers(self):
@@ -21,9 +183,7 @@ class FlexgeService:
         }
     
     async def get_students(self, page: int = 1):
-        url = f"{self.base_url}/students?page={page}"
-        resp = requests.get(url, headers=self.generate_headers(), timeout=10)
-        return resp.json() if resp.status_code == 200 else None
+        return await buscar_pagina_students(page)
     
     async def buscar_aluno_por_email(self, email: str):
         """
@@ -33,39 +193,11 @@ class FlexgeService:
 
     async def buscar_aluno_flexge_por_email(self, email: str):
         """
-        Busca um aluno no Flexge pelo email
+        Busca um aluno no Flexge pelo email (via índice em memória)
         """
         try:
-            page = 1
-            while True:
-                url = f"{self.base_url}/students?page={page}"
-                resp = requests.get(url, headers=self.generate_headers(), timeout=10)
-                if resp.status_code != 200:
-                    break
-                    
-                data = resp.json()
-                if not data.get("docs"):
-                    break
-                    
-                # Procurar aluno pelo email
-                for student in data["docs"]:
-                    if student.get("email", "").lower() == email.lower():
-                        return {
-                            "id": student["_id"],
-                            "name": student.get("name", ""),
-                            "email": student.get("email", ""),
-                            "level": student.get("level", ""),
-                            "enabled": student.get("enabled", True),
-                            "lastAccess": student.get("lastAccess", "")
-                        }
-                
-                # Se não há mais páginas
-                if not data.get("hasNextPage", False):
-                    break
-                    
-                page += 1
-                
-            return None
+            aluno = await flexge_index.buscar_por_email(email)
+            return aluno.para_dict() if aluno else None
             
         except Exception as e:
             print(f"Erro ao buscar aluno no Flexge: {str(e)}")
@@ -77,41 +209,26 @@ class FlexgeService:
         """
         return await self.notion_service.buscar_aluno_por_whatsapp(phone)
         
-    async def patch_student_action(self, student_id: str, action: str):
-        url = f"{self.base_url}/students/{action}"
-        payload = {"students": [student_id]}
-        return requests.patch(url, headers=self.generate_headers(), json=payload, timeout=10)
+    async def patch_student_action(self, student_id: str, action: str) -> bool:
+        return await patch_students_action_lote([student_id], action)
     
     async def buscar_erros_gramatica(self, aluno_id: str):
-        url = f"{self.base_url}/students/{aluno_id}/studied-grammars?page=1"
-        resp = requests.get(url, headers=self.generate_headers(), timeout=10)
-        return resp.json() if resp.status_code == 200 else None
+        return await buscar_studied_grammars(aluno_id)
     
     async def buscar_resultados_mastery(self, aluno_id: str):
-        url = f"{self.base_url}/students/{aluno_id}/mastery-tests?page=1"
-        resp = requests.get(url, headers=self.generate_headers(), timeout=10)
-        return resp.json() if resp.status_code == 200 else None
+        return await flexge_get_json(f"/students/{aluno_id}/mastery-tests?page=1")
     
     async def gerar_resposta_gpt(self, topico: str):
-        prompt = f"""
-        Crie uma explicação completa sobre '{topico}' com:
-        - 1 definição simples
-        - 3 exemplos bilíngues (EN → PT)
-        - 2 dicas práticas
-        Formato: Texto simples com no máximo 5 linhas"""
-        
-        try:
-            resp = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Você é um professor de inglês direto e prático, que ensina alunos com TDAH"},
-                    {"role": "user", "content": prompt}
-                ],
-                timeout=10
-            )
-            return resp.choices[0].message.content
-        except Exception:
-            return f"Explicação sobre {topico} não disponível no momento. Por favor tente mais tarde."
+        """
+        Explicação do tópico vinda da biblioteca (gerada só na primeira vez)
+        """
+        return await explicacoes_gramatica.obter(topico)
+
+    async def gerar_respostas_gpt(self, topicos: List[str]) -> List[str]:
+        """
+        Explicações de vários tópicos, com as faltantes geradas em paralelo
+        """
+        return await explicacoes_gramatica.obter_varias(topicos)
 
     async def buscar_detalhes_prova(self, aluno_email: str):
         """
@@ -127,50 +244,25 @@ class FlexgeService:
             aluno_id = aluno_flexge["id"]
             
             # Buscar mastery tests
-            url_tests = f"{self.base_url}/students/{aluno_id}/mastery-tests"
-            resp_tests = requests.get(url_tests, headers=self.generate_headers(), timeout=10)
-            if resp_tests.status_code != 200:
+            mastery_tests = await flexge_get_json(f"/students/{aluno_id}/mastery-tests")
+            if mastery_tests is None:
                 return None
-                
-            mastery_tests = resp_tests.json()
-            resultados = []
-            
-            # Pegar os 3 testes mais recentes
-            for test in mastery_tests[:3]:
-                mastery_test_id = test["_id"]
-                
-                # Buscar execuções desse mastery test
-                url_exec = f"{self.base_url}/students/{aluno_id}/mastery-tests/{mastery_test_id}/executions"
-                resp_exec = requests.get(url_exec, headers=self.generate_headers(), timeout=10)
-                if resp_exec.status_code != 200:
-                    continue
-                    
-                execucoes = resp_exec.json()
-                for execucao in execucoes:
-                    execution_id = execucao["_id"]
-                    
-                    # Buscar respostas do aluno nessa execução
-                    url_items = f"{self.base_url}/students/{aluno_id}/mastery-tests/{mastery_test_id}/executions/{execution_id}/items"
-                    resp_items = requests.get(url_items, headers=self.generate_headers(), timeout=10)
-                    if resp_items.status_code != 200:
-                        continue
-                        
-                    respostas = resp_items.json()
-                    resultados.append({
-                        "test_name": test.get("name", ""),
-                        "test_date": execucao.get("startedAt", ""),
-                        "score": execucao.get("score", 0),
-                        "total_questions": len(respostas),
-                        "correct_answers": sum(1 for r in respostas if r.get("isCorrect", False)),
-                        "questions": [{
-                            "question": r.get("question", ""),
-                            "correct_answer": r.get("correctAnswer", ""),
-                            "student_answer": r.get("studentAnswer", ""),
-                            "is_correct": r.get("isCorrect", False)
-                        } for r in respostas]
-                    })
             
-            return resultados
+            # Pegar os 3 testes mais recentes, com execuções e respostas em paralelo
+            execucoes = await buscar_execucoes_mastery(aluno_id, mastery_tests[:3])
+            return [{
+                "test_name": test.get("name", ""),
+                "test_date": execucao.get("startedAt", ""),
+                "score": execucao.get("score", 0),
+                "total_questions": len(respostas),
+                "correct_answers": sum(1 for r in respostas if r.get("isCorrect", False)),
+                "questions": [{
+                    "question": r.get("question", ""),
+                    "correct_answer": r.get("correctAnswer", ""),
+                    "student_answer": r.get("studentAnswer", ""),
+                    "is_correct": r.get("isCorrect", False)
+                } for r in respostas]
+            } for test, execucao, respostas in execucoes]
             
         except Exception as e:
             print(f"Erro ao buscar detalhes da prova: {str(e)}")
@@ -183,49 +275,31 @@ def generate_headers():
         "Content-Type": "application/json"
     }
 
-def buscar_aluno_por_numero(numero):
+async def buscar_aluno_por_numero(numero):
     # Aqui você pode adaptar para buscar por telefone, email, etc.
-    url = f"{settings.FLEXGE_API_BASE}/students?page=1"
-    resp = requests.get(url, headers=generate_headers(), timeout=10)
-    if resp.status_code != 200:
+    dados = await buscar_pagina_students(1)
+    if dados is None:
         return None
-    alunos = resp.json().get("docs", [])
+    alunos = dados.get("docs", [])
     for aluno in alunos:
         if aluno.get("phone") == numero or aluno.get("numero") == numero:
             return aluno
     return None
 
-def processar_mastery_test(numero):
-    aluno = buscar_aluno_por_numero(numero)
+async def processar_mastery_test(numero):
+    aluno = await buscar_aluno_por_numero(numero)
     if not aluno:
         return {"erro": "Aluno não encontrado"}
     student_id = aluno["_id"]
     # 1. Buscar todos os mastery tests do aluno
-    url_tests = f"{settings.FLEXGE_API_BASE}/students/{student_id}/mastery-tests"
-    resp_tests = requests.get(url_tests, headers=generate_headers(), timeout=10)
-    if resp_tests.status_code != 200:
+    mastery_tests = await flexge_get_json(f"/students/{student_id}/mastery-tests")
+    if mastery_tests is None:
         return {"erro": "Não foi possível buscar mastery tests"}
-    mastery_tests = resp_tests.json()
-    resultados = []
-    for test in mastery_tests:
-        mastery_test_id = test["_id"]
-        # 2. Buscar execuções desse mastery test
-        url_exec = f"{settings.FLEXGE_API_BASE}/students/{student_id}/mastery-tests/{mastery_test_id}/executions"
-        resp_exec = requests.get(url_exec, headers=generate_headers(), timeout=10)
-        if resp_exec.status_code != 200:
-            continue
-        execucoes = resp_exec.json()
-        for execucao in execucoes:
-            execution_id = execucao["_id"]
-            # 3. Buscar respostas do aluno nessa execução
-            url_items = f"{settings.FLEXGE_API_BASE}/students/{student_id}/mastery-tests/{mastery_test_id}/executions/{execution_id}/items"
-            resp_items = requests.get(url_items, headers=generate_headers(), timeout=10)
-            if resp_items.status_code != 200:
-                continue
-            respostas = resp_items.json()
-            resultados.append({
-                "mastery_test": test,
-                "execucao": execucao,
-                "respostas": respostas
-            })
+    # 2. e 3. Buscar execuções e respostas de todos os testes em paralelo
+    execucoes = await buscar_execucoes_mastery(student_id, mastery_tests)
+    resultados = [{
+        "mastery_test": test,
+        "execucao": execucao,
+        "respostas": respostas
+    } for test, execucao, respostas in execucoes]
     return {"aluno": aluno, "resultados": resultados} 
\ No newline at end of file
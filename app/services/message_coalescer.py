@@ -0,0 +1,144 @@
+"""
+Agrupamento das mensagens de um aluno enviadas em sequência.
+
+Alunos costumam mandar várias mensagens curtas seguidas ("oi", "tudo
+bem?", "meu boleto..."). Em vez de uma consulta à Zaia (e uma resposta)
+por mensagem, as mensagens já extraídas (texto, áudio transcrito, ...)
+de um telefone ficam num lote até que ele passe WHATSAPP_COALESCE_QUIET
+segundos sem novas mensagens, ou até WHATSAPP_COALESCE_MAX_WAIT segundos
+desde a primeira. O lote vira um único prompt e uma única resposta.
+
+A resposta do lote é enfileirada na fila de webhooks com a chave do
+telefone, então continua na ordem em relação às demais mensagens dele.
+Com WHATSAPP_COALESCE_QUIET=0 cada mensagem é respondida na hora.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.webhook_queue import webhook_queue
+
+logger = logging.getLogger(__name__)
+
+Responder = Callable[[Dict], Awaitable[Any]]
+
+
+def combinar(resultados: List[Dict]) -> Dict:
+    """
+    Junta as mensagens processadas de um lote num único resultado
+    (aluno mais recente; áudio se alguma das mensagens foi áudio)
+    """
+    if len(resultados) == 1:
+        return resultados[0]
+    combinado = dict(resultados[-1])
+    combinado["message"] = "\n".join(r["message"].strip() for r in resultados if r.get("message"))
+    if any(r.get("type") == "audio" for r in resultados):
+        combinado["type"] = "audio"
+    combinado["agrupadas"] = len(resultados)
+    return combinado
+
+
+class _Lote:
+    __slots__ = ("resultados", "responder", "primeira", "timer")
+
+    def __init__(self, responder: Responder):
+        self.resultados: List[Dict] = []
+        self.responder = responder
+        self.primeira = time.monotonic()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MessageCoalescer:
+    def __init__(self, silencio: Optional[float] = None, espera_maxima: Optional[float] = None):
+        self.silencio = silencio if silencio is not None else settings.WHATSAPP_COALESCE_QUIET
+        self.espera_maxima = espera_maxima if espera_maxima is not None else settings.WHATSAPP_COALESCE_MAX_WAIT
+        self._lotes: Dict[str, _Lote] = {}
+        self._parado = False
+        self.mensagens = 0
+        self.lotes = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.silencio > 0
+
+    @staticmethod
+    def _chave(phone: str) -> str:
+        return ''.join(filter(str.isdigit, phone or "")) or (phone or "")
+
+    async def _responder(self, lote: _Lote):
+        resultado = combinar(lote.resultados)
+        if len(lote.resultados) > 1:
+            logger.info(f"{len(lote.resultados)} mensagens agrupadas em uma consulta à Zaia")
+        try:
+            await lote.responder(resultado)
+        except Exception as e:
+            logger.error(f"Erro ao responder lote de mensagens: {str(e)}")
+
+    def _disparar(self, chave: str):
+        lote = self._lotes.pop(chave, None)
+        if lote is None:
+            return
+        if not webhook_queue.enfileirar(chave, lambda: self._responder(lote)):
+            # Fila cheia ou em desligamento: responde fora da fila
+            asyncio.ensure_future(self._responder(lote))
+
+    async def adicionar(self, phone: str, resultado: Dict, responder: Responder):
+        """
+        Acrescenta a mensagem processada ao lote do telefone; `responder`
+        é chamado uma vez com o resultado combinado quando o lote fecha
+        """
+        if not self.habilitado or self._parado:
+            await responder(resultado)
+            return
+        chave = self._chave(phone)
+        lote = self._lotes.get(chave)
+        if lote is None:
+            lote = self._lotes[chave] = _Lote(responder)
+            self.lotes += 1
+        lote.resultados.append(resultado)
+        lote.responder = responder
+        self.mensagens += 1
+
+        if lote.timer is not None:
+            lote.timer.cancel()
+        restante = lote.primeira + self.espera_maxima - time.monotonic()
+        atraso = max(0.0, min(self.silencio, restante))
+        lote.timer = asyncio.get_running_loop().call_later(atraso, self._disparar, chave)
+
+    async def descarregar(self, phone: str):
+        """
+        Responde agora o lote pendente do telefone (ex.: antes de uma
+        mensagem que não deve ser agrupada). Chamado de dentro do job do
+        telefone, o que mantém a ordem das respostas.
+        """
+        lote = self._lotes.pop(self._chave(phone), None)
+        if lote is None:
+            return
+        if lote.timer is not None:
+            lote.timer.cancel()
+        await self._responder(lote)
+
+    def metricas(self) -> Dict[str, int]:
+        return {
+            "mensagens": self.mensagens,
+            "lotes": self.lotes,
+            "pendentes": len(self._lotes),
+        }
+
+    def parar(self):
+        """
+        Fecha todos os lotes pendentes (enfileirando as respostas), para
+        que sejam drenados junto com a fila de webhooks. Mensagens que
+        chegarem depois são respondidas sem agrupamento.
+        """
+        self._parado = True
+        for chave in list(self._lotes):
+            lote = self._lotes[chave]
+            if lote.timer is not None:
+                lote.timer.cancel()
+            self._disparar(chave)
+
+
+message_coalescer = MessageCoalescer()
@@ -0,0 +1,185 @@
+"""
+Deduplicação de webhooks pelo messageId do Z-API.
+
+Cada messageId passa por dois estados: "processando" (desde a chegada até
+o fim do job) e "concluido" (por WEBHOOK_DEDUP_WINDOW segundos). Um retry
+do Z-API que chega em qualquer um dos dois estados é descartado. Se o job
+falhar, o id é liberado para que um novo retry seja processado. Um id
+preso em "processando" por mais de WEBHOOK_DEDUP_PROCESSING_TIMEOUT
+(worker reiniciado no meio do job) volta a ser aceito.
+
+Por padrão o store fica em memória (limitado a WEBHOOK_DEDUP_MAXSIZE);
+com WEBHOOK_DEDUP_PERSIST e DATABASE_URL em SQLite ele é compartilhado
+entre workers e sobrevive a restarts.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import SQLiteConnection, sqlite_path
+
+logger = logging.getLogger(__name__)
+
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_dedup (
+    message_id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_dedup_updated_at ON webhook_dedup (updated_at);
+"""
+
+_PODA_A_CADA = 500
+
+
+class MessageDeduplicator:
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        janela: Optional[float] = None,
+        timeout_processando: Optional[float] = None,
+        database_url: Optional[str] = None,
+        persistir: Optional[bool] = None,
+    ):
+        self.maxsize = maxsize or settings.WEBHOOK_DEDUP_MAXSIZE
+        self.janela = janela or settings.WEBHOOK_DEDUP_WINDOW
+        self.timeout_processando = timeout_processando or settings.WEBHOOK_DEDUP_PROCESSING_TIMEOUT
+        persistir = settings.WEBHOOK_DEDUP_PERSIST if persistir is None else persistir
+        path = sqlite_path(database_url) if persistir else None
+        self._db: Optional[SQLiteConnection] = SQLiteConnection(path) if path else None
+        self._schema_criado = False
+        self._memoria: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._gravacoes = 0
+        self.duplicados = 0
+
+    # --- SQLite (executado em thread) -------------------------------------
+
+    def _garantir_schema(self):
+        if not self._schema_criado:
+            self._db.executescript(_SCHEMA)
+            self._schema_criado = True
+
+    def _iniciar_sqlite(self, message_id: str, agora: float) -> bool:
+        self._garantir_schema()
+        # Insere ou "retoma" uma entrada expirada; qualquer outra colisão é duplicata
+        alteradas = self._db.execute_rowcount(
+            "INSERT INTO webhook_dedup (message_id, estado, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(message_id) DO UPDATE SET estado = excluded.estado, updated_at = excluded.updated_at "
+            "WHERE (webhook_dedup.estado = ? AND webhook_dedup.updated_at < ?) "
+            "OR (webhook_dedup.estado = ? AND webhook_dedup.updated_at < ?)",
+            (
+                message_id, PROCESSANDO, agora,
+                PROCESSANDO, agora - self.timeout_processando,
+                CONCLUIDO, agora - self.janela,
+            ),
+        )
+        self._gravacoes += 1
+        if self._gravacoes % _PODA_A_CADA == 0:
+            self._db.execute(
+                "DELETE FROM webhook_dedup WHERE updated_at < ?",
+                (agora - max(self.janela, self.timeout_processando),),
+            )
+        return alteradas > 0
+
+    def _concluir_sqlite(self, message_id: str, agora: float):
+        self._garantir_schema()
+        self._db.execute(
+            "UPDATE webhook_dedup SET estado = ?, updated_at = ? WHERE message_id = ?",
+            (CONCLUIDO, agora, message_id),
+        )
+
+    def _liberar_sqlite(self, message_id: str):
+        self._garantir_schema()
+        self._db.execute("DELETE FROM webhook_dedup WHERE message_id = ?", (message_id,))
+
+    # --- Memória -------------------------------------------------------------
+
+    def _iniciar_memoria(self, message_id: str, agora: float) -> bool:
+        entrada = self._memoria.get(message_id)
+        if entrada is not None:
+            estado, atualizado_em = entrada
+            validade = self.timeout_processando if estado == PROCESSANDO else self.janela
+            if atualizado_em >= agora - validade:
+                return False
+        self._memoria[message_id] = (PROCESSANDO, agora)
+        self._memoria.move_to_end(message_id)
+        while len(self._memoria) > self.maxsize:
+            self._memoria.popitem(last=False)
+        return True
+
+    # --- API ---------------------------------------------------------------
+
+    async def iniciar(self, message_id: Optional[str]) -> bool:
+        """
+        Marca o messageId como em processamento.
+        Retorna False se for duplicata (em processamento ou já concluído).
+        Sem messageId não há como deduplicar e a mensagem é aceita.
+        """
+        if not message_id:
+            return True
+        agora = time.time()
+        if self._db is not None:
+            try:
+                novo = await asyncio.to_thread(self._iniciar_sqlite, message_id, agora)
+            except Exception as e:
+                logger.error(f"Erro ao consultar deduplicação no SQLite: {str(e)}")
+                novo = True
+        else:
+            novo = self._iniciar_memoria(message_id, agora)
+        if not novo:
+            self.duplicados += 1
+            logger.info(f"Webhook duplicado descartado: messageId={message_id}")
+        return novo
+
+    async def concluir(self, message_id: Optional[str]):
+        if not message_id:
+            return
+        agora = time.time()
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._concluir_sqlite, message_id, agora)
+            except Exception as e:
+                logger.error(f"Erro ao gravar deduplicação no SQLite: {str(e)}")
+            return
+        if message_id in self._memoria:
+            self._memoria[message_id] = (CONCLUIDO, agora)
+
+    async def liberar(self, message_id: Optional[str]):
+        """
+        Esquece o messageId (job falhou: um retry deve ser processado)
+        """
+        if not message_id:
+            return
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._liberar_sqlite, message_id)
+            except Exception as e:
+                logger.error(f"Erro ao liberar deduplicação no SQLite: {str(e)}")
+            return
+        self._memoria.pop(message_id, None)
+
+    async def executar(self, message_id: Optional[str], job: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa o job marcando o messageId como concluído ao final,
+        ou liberando-o se o job levantar exceção
+        """
+        try:
+            resultado = await job()
+        except BaseException:
+            await self.liberar(message_id)
+            raise
+        await self.concluir(message_id)
+        return resultado
+
+    def fechar(self):
+        if self._db is not None:
+            self._db.close()
+
+
+message_dedup = MessageDeduplicator()
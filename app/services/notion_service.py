@@ -1,192 +1,237 @@
 from app.core.config import settings
-import requests
-import json
-from typing import Optional, Dict
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.http_client import http_clients
+from app.core.logs import resumo
+from app.utils.cache import TTLCache
+import aiohttp
+from urllib.parse import unquote
+from typing import Optional, Dict, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Propriedades do banco de alunos que realmente decodificamos
+PROPRIEDADES_ALUNO = (
+    "Student Name",
+    "Email",
+    "Telefone",
+    "CPF",
+    "Plano",
+    "Endereço Completo",
+    "Nível",
+    "Status",
+)
+
+# Cache compartilhado de alunos, chaveado por ("whatsapp", telefone) e ("email", email)
+_cache_alunos = TTLCache(
+    maxsize=settings.ALUNO_CACHE_MAXSIZE,
+    ttl=settings.ALUNO_CACHE_TTL,
+    negative_ttl=settings.ALUNO_CACHE_NEGATIVE_TTL,
+)
+
+def normalizar_telefone(phone: str) -> str:
+    return ''.join(filter(str.isdigit, phone or ""))
+
 class NotionService:
+    # IDs das propriedades usadas no filter_properties (compartilhado entre instâncias)
+    _property_ids: Optional[List[str]] = None
+
     def __init__(self):
         self.api_key = settings.NOTION_API_KEY
         self.database_id = settings.NOTION_DATABASE_ID
         self.base_url = "https://api.notion.com/v1"
-        
+
     def _get_headers(self):
         return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28"
         }
-        
+
+    async def _get_filter_properties(self) -> List[Tuple[str, str]]:
+        """
+        Resolve (uma única vez) os IDs das propriedades do aluno para o
+        parâmetro filter_properties, que só aceita IDs.
+        Se o schema não puder ser lido, a consulta segue sem filtro.
+        """
+        if NotionService._property_ids is None:
+            try:
+                url = f"{self.base_url}/databases/{self.database_id}"
+                session = http_clients.session("notion")
+                async with session.get(url, headers=self._get_headers()) as response:
+                    response.raise_for_status()
+                    schema = await response.json()
+                properties = schema.get("properties", {})
+                # O Notion devolve os IDs já codificados para URL
+                NotionService._property_ids = [
+                    unquote(properties[nome]["id"]) for nome in PROPRIEDADES_ALUNO if nome in properties
+                ]
+            except Exception as e:
+                logger.warning(f"Não foi possível ler o schema do Notion: {str(e)}")
+                return []
+        return [("filter_properties", prop_id) for prop_id in NotionService._property_ids]
+
+    async def _consultar_aluno(self, filtro: Dict) -> Optional[Dict]:
+        """
+        Consulta o banco de alunos e retorna o primeiro resultado (ou None)
+        """
+        url = f"{self.base_url}/databases/{self.database_id}/query"
+        payload = {
+            "filter": filtro,
+            "page_size": 1
+        }
+        params = await self._get_filter_properties()
+
+        logger.debug("URL da consulta: %s", url)
+        logger.debug("Payload da consulta: %s", resumo(payload))
+
+        session = http_clients.session("notion")
+        async with session.post(url, headers=self._get_headers(), params=params, json=payload) as response:
+            logger.debug("Status da resposta: %s", response.status)
+            response.raise_for_status()
+            data = await response.json()
+
+        results = data.get("results")
+        return results[0] if results else None
+
+    def _extrair_aluno(self, student: Dict) -> Dict:
+        """
+        Converte uma página do Notion no dicionário de aluno usado pela aplicação
+        """
+        properties = student.get("properties", {})
+
+        logger.debug("Propriedades encontradas: %s", properties.keys())
+
+        # Extrair dados com tratamento de erro para cada campo
+        def get_rich_text_content(prop_name):
+            try:
+                rich_text = properties.get(prop_name, {}).get("rich_text", [])
+                return rich_text[0].get("text", {}).get("content", "") if rich_text else ""
+            except (IndexError, KeyError, TypeError):
+                logger.warning(f"Erro ao extrair {prop_name}")
+                return ""
+
+        def get_title_content(prop_name):
+            try:
+                title = properties.get(prop_name, {}).get("title", [])
+                return title[0].get("text", {}).get("content", "") if title else ""
+            except (IndexError, KeyError, TypeError):
+                logger.warning(f"Erro ao extrair {prop_name}")
+                return ""
+
+        def get_select_name(prop_name):
+            try:
+                select = properties.get(prop_name, {}).get("select", {})
+                return select.get("name", "") if select else ""
+            except (KeyError, TypeError):
+                logger.warning(f"Erro ao extrair {prop_name}")
+                return ""
+
+        # Mapear os dados do aluno com os campos corretos
+        return {
+            "id": student.get("id", ""),
+            "nome": get_title_content("Student Name"),
+            "email": properties.get("Email", {}).get("email", ""),
+            "telefone": get_rich_text_content("Telefone"),
+            "cpf": get_rich_text_content("CPF"),
+            "plano": get_select_name("Plano"),
+            "endereco": get_rich_text_content("Endereço Completo"),
+            "nivel": get_select_name("Nível"),
+            "status": get_select_name("Status")
+        }
+
+    @staticmethod
+    def invalidar_cache_aluno(phone: Optional[str] = None, email: Optional[str] = None):
+        """
+        Remove um aluno do cache (ex.: após alterar o cadastro no Notion)
+        """
+        if phone:
+            _cache_alunos.invalidate(("whatsapp", normalizar_telefone(phone)))
+        if email:
+            _cache_alunos.invalidate(("email", email.lower()))
+
+    def _guardar_no_cache(self, aluno_data: Dict):
+        """
+        Indexa o aluno também pela outra chave (telefone/email)
+        """
+        if aluno_data.get("email"):
+            _cache_alunos.set(("email", aluno_data["email"].lower()), aluno_data)
+
+    async def _carregar_por_whatsapp(self, phone_formatted: str) -> Optional[Dict]:
+        student = await self._consultar_aluno({
+            "property": "Telefone",
+            "rich_text": {
+                "contains": phone_formatted
+            }
+        })
+        if not student:
+            logger.info("Nenhum resultado encontrado no Notion")
+            return None
+
+        aluno_data = self._extrair_aluno(student)
+        self._guardar_no_cache(aluno_data)
+        logger.info(f"Dados do aluno extraídos com sucesso: {aluno_data['nome']}")
+        return aluno_data
+
+    async def _carregar_por_email(self, email: str) -> Optional[Dict]:
+        student = await self._consultar_aluno({
+            "property": "Email",
+            "email": {
+                "equals": email
+            }
+        })
+        if not student:
+            logger.info(f"Nenhum aluno encontrado com o email: {email}")
+            return None
+
+        aluno_data = self._extrair_aluno(student)
+        logger.info(f"Dados do aluno extraídos com sucesso: {aluno_data['nome']}")
+        return aluno_data
+
     async def buscar_aluno_por_whatsapp(self, phone: str) -> Optional[Dict]:
         """
         Busca dados do aluno pelo número do WhatsApp no banco do Notion
+        (com cache e single-flight por telefone)
         """
         try:
             # Formatar número para garantir consistência (remover caracteres especiais)
-            phone_formatted = ''.join(filter(str.isdigit, phone))
+            phone_formatted = normalizar_telefone(phone)
             logger.info(f"Buscando aluno no Notion com telefone: {phone} -> formatado: {phone_formatted}")
-            
-            # Construir a query para o Notion
-            url = f"{self.base_url}/databases/{self.database_id}/query"
-            payload = {
-                "filter": {
-                    "property": "Telefone",
-                    "rich_text": {
-                        "contains": phone_formatted
-                    }
-                }
-            }
-            
-            logger.debug(f"URL da consulta: {url}")
-            logger.debug(f"Payload da consulta: {json.dumps(payload, indent=2)}")
-            
-            response = requests.post(
-                url,
-                headers=self._get_headers(),
-                json=payload
+
+            aluno_data = await _cache_alunos.get_or_load(
+                ("whatsapp", phone_formatted),
+                lambda: self._carregar_por_whatsapp(phone_formatted)
             )
-            
-            logger.info(f"Status da resposta: {response.status_code}")
-            logger.debug(f"Resposta completa: {response.text}")
-            
-            response.raise_for_status()
-            
-            data = response.json()
-            if not data.get("results"):
-                logger.info("Nenhum resultado encontrado no Notion")
-                return None
-                
-            # Pegar o primeiro resultado
-            student = data["results"][0]
-            properties = student.get("properties", {})
-            
-            logger.debug(f"Propriedades encontradas: {list(properties.keys())}")
-            
-            # Extrair dados com tratamento de erro para cada campo
-            def get_rich_text_content(prop_name):
-                try:
-                    rich_text = properties.get(prop_name, {}).get("rich_text", [])
-                    return rich_text[0].get("text", {}).get("content", "") if rich_text else ""
-                except (IndexError, KeyError, TypeError):
-                    logger.warning(f"Erro ao extrair {prop_name}")
-                    return ""
-                    
-            def get_title_content(prop_name):
-                try:
-                    title = properties.get(prop_name, {}).get("title", [])
-                    return title[0].get("text", {}).get("content", "") if title else ""
-                except (IndexError, KeyError, TypeError):
-                    logger.warning(f"Erro ao extrair {prop_name}")
-                    return ""
-                    
-            def get_select_name(prop_name):
-                try:
-                    select = properties.get(prop_name, {}).get("select", {})
-                    return select.get("name", "") if select else ""
-                except (KeyError, TypeError):
-                    logger.warning(f"Erro ao extrair {prop_name}")
-                    return ""
-            
-            # Mapear os dados do aluno com os campos corretos
-            aluno_data = {
-                "id": student.get("id", ""),
-                "nome": get_title_content("Student Name"),
-                "email": properties.get("Email", {}).get("email", ""),
-                "telefone": get_rich_text_content("Telefone"),
-                "cpf": get_rich_text_content("CPF"),
-                "plano": get_select_name("Plano"),
-                "endereco": get_rich_text_content("Endereço Completo"),
-                "nivel": get_select_name("Nível"),
-                "status": get_select_name("Status")
-            }
-            
-            logger.info(f"Dados do aluno extraídos com sucesso: {aluno_data['nome']}")
-            return aluno_data
-            
-        except requests.exceptions.RequestException as e:
+            return dict(aluno_data) if aluno_data else None
+
+        except CircuitOpenError:
+            # Notion fora do ar: quem chama decide a mensagem (não é "aluno não encontrado")
+            raise
+        except aiohttp.ClientError as e:
             logger.error(f"Erro na requisição ao Notion: {str(e)}")
             return None
         except Exception as e:
             logger.error(f"Erro ao buscar aluno no Notion: {str(e)}")
             return None
-            
+
     async def buscar_aluno_por_email(self, email: str) -> Optional[Dict]:
         """
         Busca um aluno no banco de dados do Notion pelo email
+        (com cache e single-flight por email)
         """
         try:
-            url = f"{self.base_url}/databases/{self.database_id}/query"
-            payload = {
-                "filter": {
-                    "property": "Email",
-                    "email": {
-                        "equals": email.lower()
-                    }
-                }
-            }
-            
-            response = requests.post(
-                url,
-                headers=self._get_headers(),
-                json=payload
+            email = email.lower()
+            aluno_data = await _cache_alunos.get_or_load(
+                ("email", email),
+                lambda: self._carregar_por_email(email)
             )
-            response.raise_for_status()
-            
-            data = response.json()
-            if not data.get("results"):
-                logger.info(f"Nenhum aluno encontrado com o email: {email}")
-                return None
-                
-            # Pegar o primeiro resultado
-            student = data["results"][0]
-            properties = student.get("properties", {})
-            
-            # Extrair dados com tratamento de erro para cada campo
-            def get_rich_text_content(prop_name):
-                try:
-                    rich_text = properties.get(prop_name, {}).get("rich_text", [])
-                    return rich_text[0].get("text", {}).get("content", "") if rich_text else ""
-                except (IndexError, KeyError, TypeError):
-                    logger.warning(f"Erro ao extrair {prop_name}")
-                    return ""
-                    
-            def get_title_content(prop_name):
-                try:
-                    title = properties.get(prop_name, {}).get("title", [])
-                    return title[0].get("text", {}).get("content", "") if title else ""
-                except (IndexError, KeyError, TypeError):
-                    logger.warning(f"Erro ao extrair {prop_name}")
-                    return ""
-                    
-            def get_select_name(prop_name):
-                try:
-                    select = properties.get(prop_name, {}).get("select", {})
-                    return select.get("name", "") if select else ""
-                except (KeyError, TypeError):
-                    logger.warning(f"Erro ao extrair {prop_name}")
-                    return ""
-            
-            # Mapear os dados do aluno com os campos corretos
-            aluno_data = {
-                "id": student.get("id", ""),
-                "nome": get_title_content("Student Name"),
-                "email": properties.get("Email", {}).get("email", ""),
-                "telefone": get_rich_text_content("Telefone"),
-                "cpf": get_rich_text_content("CPF"),
-                "plano": get_select_name("Plano"),
-                "endereco": get_rich_text_content("Endereço Completo"),
-                "nivel": get_select_name("Nível"),
-                "status": get_select_name("Status")
-            }
-            
-            logger.info(f"Dados do aluno extraídos com sucesso: {aluno_data['nome']}")
-            return aluno_data
-            
-        except requests.exceptions.RequestException as e:
+            return dict(aluno_data) if aluno_data else None
+
+        except CircuitOpenError:
+            raise
+        except aiohttp.ClientError as e:
             logger.error(f"Erro na requisição ao Notion: {str(e)}")
             return None
         except Exception as e:
             logger.error(f"Erro ao buscar aluno no Notion: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
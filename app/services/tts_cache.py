@@ -0,0 +1,153 @@
+"""
+Cache em disco dos áudios sintetizados (OGG final).
+
+A chave é o SHA-256 de (texto normalizado, voz, modelo, voice_settings,
+formato de saída), então qualquer mudança de configuração gera entradas
+novas. As gravações são atômicas (arquivo temporário + os.replace) e o
+diretório é limitado a TTS_CACHE_MAX_BYTES, removendo primeiro os
+arquivos usados há mais tempo (o mtime é renovado a cada acerto).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_EXTENSAO = ".ogg"
+
+
+def normalizar_texto(texto: str) -> str:
+    return re.sub(r"\s+", " ", texto or "").strip()
+
+
+class TTSCache:
+    def __init__(self, diretorio: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.diretorio = diretorio or settings.TTS_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else settings.TTS_CACHE_MAX_BYTES
+        self._tamanho_total: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def chave(texto: str, voice_id: str, model_id: str, voice_settings: Dict, output_format: str) -> str:
+        material = json.dumps(
+            [normalizar_texto(texto), voice_id, model_id, voice_settings, output_format],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, chave + _EXTENSAO)
+
+    # --- Operações de disco (executadas em thread) --------------------------
+
+    def _ler(self, chave: str) -> Optional[bytes]:
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as arquivo:
+                dados = arquivo.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(caminho)  # marca como usado recentemente (LRU)
+        except OSError:
+            pass
+        return dados
+
+    def _medir(self) -> int:
+        total = 0
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(_EXTENSAO):
+                    total += entrada.stat().st_size
+        return total
+
+    def _gravar(self, chave: str, dados: bytes):
+        os.makedirs(self.diretorio, exist_ok=True)
+        if self._tamanho_total is None:
+            self._tamanho_total = self._medir()
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as arquivo:
+                arquivo.write(dados)
+            caminho = self._caminho(chave)
+            try:
+                # Sobrescrita (outro worker gravou a mesma chave): não conta o arquivo duas vezes
+                anterior = os.stat(caminho).st_size
+            except FileNotFoundError:
+                anterior = 0
+            os.replace(temporario, caminho)
+        except BaseException:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+        self._tamanho_total += len(dados) - anterior
+        if self._tamanho_total > self.max_bytes:
+            self._evictar()
+
+    def _evictar(self):
+        """
+        Remove os arquivos menos usados até ficar em 90% do limite.
+        Reescaneia o diretório, que pode ser compartilhado entre workers.
+        """
+        arquivos = []
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(_EXTENSAO):
+                    stat = entrada.stat()
+                    arquivos.append((stat.st_mtime, stat.st_size, entrada.path))
+        arquivos.sort()
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        alvo = int(self.max_bytes * 0.9)
+        for _, tamanho, caminho in arquivos:
+            if total <= alvo:
+                break
+            try:
+                os.remove(caminho)
+                total -= tamanho
+                self.evictions += 1
+            except OSError:
+                pass
+        self._tamanho_total = total
+
+    # --- API ---------------------------------------------------------------
+
+    async def obter(self, chave: str) -> Optional[bytes]:
+        try:
+            dados = await asyncio.to_thread(self._ler, chave)
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de áudio: {str(e)}")
+            dados = None
+        if dados is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return dados
+
+    async def salvar(self, chave: str, dados: bytes):
+        try:
+            await asyncio.to_thread(self._gravar, chave, dados)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de áudio: {str(e)}")
+
+    def metricas(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self._tamanho_total or 0,
+        }
+
+
+tts_cache = TTSCache()
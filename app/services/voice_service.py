@@ -1,9 +1,9 @@
-import aiohttp
-import tempfile
-import os
-import subprocess
 import base64
 from app.core.config import settings
+from app.core.http_client import http_clients
+from app.core.metrics import medir_etapa
+from app.services.tts_cache import tts_cache
+from app.utils.audio_utils import transcodificar_para_ogg, transcodificar_stream_para_ogg, TranscodeError
 import logging
 import re
 
@@ -15,6 +15,15 @@ VOICE_ID = "ie5yJLYeLpsuijLaojmF"          # Voz profissional da Karol
 MODEL_ID = "eleven_multilingual_v1"         # Modelo multilingual v1
 LANGUAGE_CODE = "pt-BR"                     # Forçar português brasileiro
 OUTPUT_FORMAT = "mp3_44100_128"            # MP3 a 44 kHz/128 kbps
+FINAL_FORMAT = "ogg_vorbis_q4"              # OGG entregue ao WhatsApp (ffmpeg libvorbis -q:a 4)
+STREAM_CHUNK_SIZE = 16 * 1024               # Pedaços do MP3 repassados ao ffmpeg no modo streaming
+VOICE_SETTINGS = {
+    "stability": 0.85,  # Aumentado para mais estabilidade
+    "similarity_boost": 0.85,  # Aumentado para manter mais características da voz original
+    "style": 0.35,
+    "use_speaker_boost": True,
+    "speed": 1.12
+}
 # -------------------------------------------------------------------
 
 def format_multilingual_text(text: str) -> str:
@@ -37,11 +46,21 @@ async def text_to_speech(text: str) -> bytes:
     """
     Converte texto para áudio usando ElevenLabs.
     Retorna os bytes do áudio em formato OGG.
+    Áudios já sintetizados com a mesma configuração vêm do cache em disco.
     """
+    chave_cache = tts_cache.chave(text, VOICE_ID, MODEL_ID, VOICE_SETTINGS, f"{OUTPUT_FORMAT}:{FINAL_FORMAT}")
+    if settings.TTS_CACHE_ENABLED:
+        audio_cache = await tts_cache.obter(chave_cache)
+        if audio_cache is not None:
+            logger.info("Áudio servido do cache")
+            return audio_cache
+
     # Formata o texto para lidar com palavras em inglês
     formatted_text = format_multilingual_text(text)
     
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
+    url = f"{settings.ELEVENLABS_API_BASE}/v1/text-to-speech/{VOICE_ID}"
+    if settings.ELEVENLABS_STREAMING:
+        url += "/stream"
     
     headers = {
         "Accept": "audio/mpeg",
@@ -52,69 +71,46 @@ async def text_to_speech(text: str) -> bytes:
     payload = {
         "text": formatted_text,
         "model_id": MODEL_ID,
-        "voice_settings": {
-            "stability": 0.85,  # Aumentado para mais estabilidade
-            "similarity_boost": 0.85,  # Aumentado para manter mais características da voz original
-            "style": 0.35,
-            "use_speaker_boost": True,
-            "speed": 1.12
-        }
+        "voice_settings": VOICE_SETTINGS
     }
 
     # Log das configurações sendo usadas
     logger.info(f"Gerando áudio com: Modelo={MODEL_ID}, Voice={VOICE_ID}")
-    logger.info(f"Configurações de voz: {payload['voice_settings']}")
+    logger.debug("Configurações de voz: %s", payload["voice_settings"])
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    # Log de sucesso
-                    logger.info("Áudio gerado com sucesso!")
-                    
-                    # Receber o áudio em MP3
-                    audio_mp3 = await response.read()
-                    
-                    # Criar arquivo temporário MP3
-                    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as mp3_temp:
-                        mp3_temp.write(audio_mp3)
-                        mp3_path = mp3_temp.name
-                        
-                    # Criar nome para arquivo OGG
-                    ogg_path = mp3_path.replace('.mp3', '.ogg')
-                    
-                    try:
-                        # Converter MP3 para OGG usando ffmpeg com configurações otimizadas
-                        subprocess.run(
-                            ['ffmpeg', '-loglevel', 'error',
-                             '-i', mp3_path,
-                             '-c:a', 'libvorbis', '-q:a', '4',
-                             ogg_path],
-                            check=True, capture_output=True
+        async with medir_etapa("tts"):
+            session = http_clients.session("elevenlabs")
+            try:
+                async with session.post(url, headers=headers, json=payload) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"Erro ao gerar áudio: {error_text}")
+                        raise Exception(f"Erro ao gerar áudio: {error_text}")
+                
+                    if settings.ELEVENLABS_STREAMING:
+                        # Alimenta o ffmpeg com o MP3 à medida que a ElevenLabs sintetiza
+                        audio_ogg = await transcodificar_stream_para_ogg(
+                            response.content.iter_chunked(STREAM_CHUNK_SIZE)
                         )
-                        
-                        # Ler o arquivo OGG
-                        with open(ogg_path, 'rb') as ogg_file:
-                            audio_ogg = ogg_file.read()
-                            
-                        return audio_ogg
-                        
-                    except subprocess.CalledProcessError as e:
-                        logger.error(f"Erro ao converter áudio: {e.stderr.decode()}")
-                        raise Exception("Erro na conversão do áudio")
-                    finally:
-                        # Limpar arquivos temporários
-                        for p in (mp3_path, ogg_path):
-                            if os.path.exists(p):
-                                try:
-                                    os.remove(p)
-                                except:
-                                    pass
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Erro ao gerar áudio: {error_text}")
-                    raise Exception(f"Erro ao gerar áudio: {error_text}")
-                    
+                    else:
+                        # Receber o áudio em MP3
+                        audio_mp3 = await response.read()
+            
+                if not settings.ELEVENLABS_STREAMING:
+                    # Converter MP3 para OGG via pipes do ffmpeg, sem bloquear o event loop
+                    audio_ogg = await transcodificar_para_ogg(audio_mp3)
+            except TranscodeError as e:
+                logger.error(f"Erro ao converter áudio: {str(e)}")
+                raise Exception("Erro na conversão do áudio")
+        
+        logger.info("Áudio gerado com sucesso!")
+        
+        if settings.TTS_CACHE_ENABLED:
+            await tts_cache.salvar(chave_cache, audio_ogg)
+            
+        return audio_ogg
+                
     except Exception as e:
         logger.error(f"Exceção ao gerar áudio: {str(e)}")
         raise 
\ No newline at end of file
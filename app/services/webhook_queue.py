@@ -0,0 +1,135 @@
+"""
+Fila de processamento dos webhooks do WhatsApp.
+
+Os endpoints de webhook apenas validam, enfileiram e respondem 200; um
+pool de workers asyncio processa os jobs. Jobs do mesmo telefone rodam
+em ordem FIFO estrita (um por vez), enquanto telefones diferentes são
+processados em paralelo. No shutdown a fila é drenada antes de parar.
+
+A mesma estrutura (WebhookJobQueue com outro nome) ordena os envios ao
+Z-API por telefone em app/services/zapi_dispatcher.py.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import registrar_fila
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class WebhookJobQueue:
+    def __init__(self, workers: Optional[int] = None, maxsize: Optional[int] = None, nome: str = "webhook"):
+        self.nome = nome
+        self.workers = workers or settings.WEBHOOK_QUEUE_WORKERS
+        self.maxsize = maxsize or settings.WEBHOOK_QUEUE_MAXSIZE
+        # telefone -> jobs pendentes; o telefone fica aqui enquanto tiver
+        # jobs pendentes ou um job em execução
+        self._filas: Dict[str, Deque[Job]] = {}
+        self._prontos: Optional[asyncio.Queue] = None
+        self._tarefas: List[asyncio.Task] = []
+        self._aceitando = True
+        self.pendentes = 0
+        self.em_execucao = 0
+        self.processados = 0
+        self.falhas = 0
+        self.rejeitados = 0
+        self.maior_profundidade = 0
+
+    def _garantir_workers(self):
+        if self._prontos is None:
+            self._prontos = asyncio.Queue()
+        self._tarefas = [t for t in self._tarefas if not t.done()]
+        while len(self._tarefas) < self.workers:
+            self._tarefas.append(asyncio.ensure_future(self._worker()))
+
+    async def iniciar(self):
+        self._aceitando = True
+        self._garantir_workers()
+
+    def enfileirar(self, phone: str, job: Job) -> bool:
+        """
+        Enfileira um job para o telefone.
+        Retorna False se a fila estiver cheia ou em desligamento.
+        """
+        if not self._aceitando or self.pendentes >= self.maxsize:
+            self.rejeitados += 1
+            logger.warning(f"Fila '{self.nome}' recusou job (pendentes={self.pendentes})")
+            return False
+        self._garantir_workers()
+
+        chave = ''.join(filter(str.isdigit, phone or "")) or (phone or "")
+        fila = self._filas.get(chave)
+        if fila is None:
+            # Telefone ocioso: passa a concorrer por um worker
+            self._filas[chave] = deque([job])
+            self._prontos.put_nowait(chave)
+        else:
+            # Já aguardando ou em execução: o worker retoma ao terminar o atual
+            fila.append(job)
+        self.pendentes += 1
+        self.maior_profundidade = max(self.maior_profundidade, self.pendentes)
+        return True
+
+    async def _worker(self):
+        while True:
+            chave = await self._prontos.get()
+            fila = self._filas[chave]
+            job = fila.popleft()
+            self.pendentes -= 1
+            self.em_execucao += 1
+            inicio = time.monotonic()
+            try:
+                await job()
+                self.processados += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.falhas += 1
+                logger.error(f"Erro ao processar job da fila '{self.nome}': {str(e)}")
+            finally:
+                self.em_execucao -= 1
+                logger.debug(f"Job da fila '{self.nome}' concluído em {time.monotonic() - inicio:.2f}s")
+                if fila:
+                    self._prontos.put_nowait(chave)
+                else:
+                    del self._filas[chave]
+                self._prontos.task_done()
+
+    def metricas(self) -> Dict[str, int]:
+        return {
+            "pendentes": self.pendentes,
+            "em_execucao": self.em_execucao,
+            "telefones_ativos": len(self._filas),
+            "processados": self.processados,
+            "falhas": self.falhas,
+            "rejeitados": self.rejeitados,
+            "maior_profundidade": self.maior_profundidade,
+            "workers": len([t for t in self._tarefas if not t.done()]),
+        }
+
+    async def parar(self, timeout: Optional[float] = None):
+        """
+        Para de aceitar jobs, aguarda a fila esvaziar (até o timeout) e
+        encerra os workers
+        """
+        self._aceitando = False
+        timeout = timeout if timeout is not None else settings.WEBHOOK_QUEUE_DRAIN_TIMEOUT
+        limite = time.monotonic() + timeout
+        while (self.pendentes or self.em_execucao) and time.monotonic() < limite:
+            await asyncio.sleep(0.1)
+        if self.pendentes or self.em_execucao:
+            logger.warning(f"Fila '{self.nome}' encerrada com {self.pendentes} jobs pendentes")
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+
+
+webhook_queue = WebhookJobQueue()
+registrar_fila("webhook", lambda: webhook_queue.pendentes)
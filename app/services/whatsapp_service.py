@@ -1,30 +1,60 @@
 from app.utils.zapi_utils import enviar_mensagem_zapi, enviar_audio_zapi
 from app.core.config import settings
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.http_client import http_clients
+from app.core.logs import resumo
+from app.core.metrics import medir_etapa
 from app.services.voice_service import text_to_speech
 from app.services.notion_service import NotionService
-import requests
+from app.services.zaia_poller import zaia_poller
+from app.services.message_coalescer import message_coalescer
+from app.services.zaia_session_store import zaia_sessions
+from app.utils.media_utils import baixar_midia
 import json
 from typing import Dict, Optional, Tuple
 from app.services.flexge_service import FlexgeService
 from app.services.asaas_service import AsaasService
 import base64
-import openai
+import hashlib
 import logging
-import aiohttp
-import asyncio
-from collections import defaultdict
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
-# Cache simples: phone -> chat_id
-chat_context_cache = defaultdict(lambda: None)
+# Análises do GPT-4 Vision por SHA-256 do conteúdo da mídia: (texto_formatado, contexto)
+_cache_analises_midia = TTLCache(
+    maxsize=settings.VISION_CACHE_MAXSIZE,
+    ttl=settings.VISION_CACHE_TTL,
+)
+
+_ASSINATURAS_IMAGEM = (
+    (b"\x89PNG", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+    (b"\xff\xd8", "image/jpeg"),
+)
+
+
+def _tipo_imagem(conteudo: bytes) -> str:
+    """
+    Identifica o MIME type da imagem pelos primeiros bytes (padrão JPEG)
+    """
+    for assinatura, mime in _ASSINATURAS_IMAGEM:
+        if conteudo.startswith(assinatura):
+            return mime
+    return "image/jpeg"
+
+# Resposta imediata quando um serviço essencial (Notion, Zaia) está com o circuito aberto
+MENSAGEM_INSTABILIDADE = (
+    "Estamos com uma instabilidade momentânea e não consigo responder agora. "
+    "Por favor, tente novamente em alguns minutos."
+)
 
 class WhatsAppService:
     def __init__(self):
         self.instance = settings.ZAPI_INSTANCE_ID
         self.token = settings.ZAPI_TOKEN
         self.base_url = f"https://api.z-api.io/instances/{self.instance}/token/{self.token}"
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
         self.notion_service = NotionService()
         
     async def processar_webhook(self, webhook_data: Dict) -> Dict:
@@ -38,7 +68,8 @@ class WhatsAppService:
             contexto = None
             
             # Buscar dados do aluno no Notion
-            aluno = await self.notion_service.buscar_aluno_por_whatsapp(phone)
+            async with medir_etapa("notion"):
+                aluno = await self.notion_service.buscar_aluno_por_whatsapp(phone)
             if not aluno:
                 return {
                     "error": "Aluno não encontrado",
@@ -80,6 +111,9 @@ class WhatsAppService:
                 "aluno": aluno
             }
             
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            return {"error": "Serviço indisponível", "message": MENSAGEM_INSTABILIDADE}
         except Exception as e:
             logger.error(f"Erro ao processar webhook: {str(e)}")
             return {"error": str(e)}
@@ -88,62 +122,74 @@ class WhatsAppService:
         """
         Extrai texto de imagens ou documentos usando GPT-4 Vision e identifica o contexto
         Retorna uma tupla (texto_extraido, contexto)
+        Mídias reenviadas (mesmo conteúdo) reaproveitam a análise anterior.
         """
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text", 
-                                "text": """Analise esta imagem/documento e me diga:
-                                1. Que tipo de documento é este? (comprovante de pagamento, screenshot de erro, etc)
-                                2. Extraia as informações relevantes.
-                                3. Se for um comprovante de pagamento, extraia: valor, data, tipo de pagamento
-                                4. Se for um screenshot de erro do Flexge, extraia: tipo de erro, mensagem de erro, contexto
-                                Responda em formato JSON com as chaves: tipo_documento, informacoes_extraidas"""
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": url,
-                            },
-                        ],
-                    }
-                ],
-                max_tokens=500,
-            )
-            
-            # Tentar parsear a resposta como JSON
-            try:
-                analise = json.loads(response.choices[0].message.content)
-                tipo_documento = analise.get("tipo_documento", "").lower()
-                informacoes = analise.get("informacoes_extraidas", {})
-                
-                if "comprovante" in tipo_documento or "pagamento" in tipo_documento:
-                    texto_formatado = f"""Comprovante de Pagamento:
-                    Valor: {informacoes.get('valor', 'não identificado')}
-                    Data: {informacoes.get('data', 'não identificada')}
-                    Tipo: {informacoes.get('tipo_pagamento', 'não identificado')}"""
-                    return texto_formatado, "comprovante_pagamento"
-                    
-                elif "erro" in tipo_documento or "screenshot" in tipo_documento:
-                    texto_formatado = f"""Erro no Flexge:
-                    Tipo: {informacoes.get('tipo_erro', 'não identificado')}
-                    Mensagem: {informacoes.get('mensagem_erro', 'não identificada')}
-                    Contexto: {informacoes.get('contexto', 'não identificado')}"""
-                    return texto_formatado, "erro_flexge"
-                    
-                else:
-                    return response.choices[0].message.content, "outro"
-                    
-            except json.JSONDecodeError:
-                return response.choices[0].message.content, "outro"
+            async with medir_etapa("visao"):
+                conteudo = await baixar_midia(url, settings.VISION_MAX_BYTES)
+                chave = hashlib.sha256(conteudo).hexdigest()
+                return await _cache_analises_midia.get_or_load(chave, lambda: self._analisar_midia(conteudo))
                 
         except Exception as e:
             logger.error(f"Erro ao extrair texto da mídia: {str(e)}")
             return f"Recebi seu {tipo}, mas não consegui analisar o conteúdo. Pode me explicar do que se trata?", "erro"
+
+    async def _analisar_midia(self, conteudo: bytes) -> Tuple[str, str]:
+        """
+        Envia a mídia ao GPT-4 Vision como data URL e interpreta a resposta
+        """
+        data_url = f"data:{_tipo_imagem(conteudo)};base64,{base64.b64encode(conteudo).decode()}"
+        response = await http_clients.openai().chat.completions.create(
+            model="gpt-4-vision-preview",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text", 
+                            "text": """Analise esta imagem/documento e me diga:
+                            1. Que tipo de documento é este? (comprovante de pagamento, screenshot de erro, etc)
+                            2. Extraia as informações relevantes.
+                            3. Se for um comprovante de pagamento, extraia: valor, data, tipo de pagamento
+                            4. Se for um screenshot de erro do Flexge, extraia: tipo de erro, mensagem de erro, contexto
+                            Responda em formato JSON com as chaves: tipo_documento, informacoes_extraidas"""
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": data_url},
+                        },
+                    ],
+                }
+            ],
+            max_tokens=500,
+        )
+        conteudo_resposta = response.choices[0].message.content
+        
+        # Tentar parsear a resposta como JSON
+        try:
+            analise = json.loads(conteudo_resposta)
+            tipo_documento = analise.get("tipo_documento", "").lower()
+            informacoes = analise.get("informacoes_extraidas", {})
+            
+            if "comprovante" in tipo_documento or "pagamento" in tipo_documento:
+                texto_formatado = f"""Comprovante de Pagamento:
+                Valor: {informacoes.get('valor', 'não identificado')}
+                Data: {informacoes.get('data', 'não identificada')}
+                Tipo: {informacoes.get('tipo_pagamento', 'não identificado')}"""
+                return texto_formatado, "comprovante_pagamento"
+                
+            elif "erro" in tipo_documento or "screenshot" in tipo_documento:
+                texto_formatado = f"""Erro no Flexge:
+                Tipo: {informacoes.get('tipo_erro', 'não identificado')}
+                Mensagem: {informacoes.get('mensagem_erro', 'não identificada')}
+                Contexto: {informacoes.get('contexto', 'não identificado')}"""
+                return texto_formatado, "erro_flexge"
+                
+            else:
+                return conteudo_resposta, "outro"
+                
+        except json.JSONDecodeError:
+            return conteudo_resposta, "outro"
             
     async def process_with_zaia(self, message: str, aluno: Optional[Dict] = None, contexto: Optional[str] = None, phone: Optional[str] = None) -> Tuple[str, bool]:
         """
@@ -151,7 +197,7 @@ class WhatsAppService:
         Retorna uma tupla (resposta, usar_audio)
         """
         try:
-            logger.info(f"Iniciando processamento com Zaia. Mensagem: {message}, Contexto: {contexto}")
+            logger.info("Iniciando processamento com Zaia. Mensagem: %s, Contexto: %s", resumo(message, texto_livre=True), contexto)
             
             # Se tiver contexto específico, tratar adequadamente
             if contexto == "comprovante_pagamento":
@@ -159,77 +205,60 @@ class WhatsAppService:
             elif contexto == "erro_flexge":
                 return await self.processar_erro_flexge(message, aluno), False
             
-            message_lower = message.lower()
-            logger.info(f"Mensagem normalizada: {message_lower}")
             logger.info("Processando com API da Zaia (novo fluxo)")
             
             url_chat = f"{settings.ZAIA_API_URL}/v1.1/api/external-generative-chat/create"
             url_message = f"{settings.ZAIA_API_URL}/v1.1/api/external-generative-message/create"
-            url_retrieve = f"{settings.ZAIA_API_URL}/v1.1/api/external-generative-message/retrieve-multiple"
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {settings.ZAIA_API_KEY}"
             }
+            session = http_clients.session("zaia")
             
-            # Se a mensagem for um e-mail e já houver chat_id, reutilize
-            if "@" in message and "." in message and chat_context_cache[phone]:
-                chat_id = chat_context_cache[phone]
+            # Reutilizar o chat da conversa se houve atividade recente
+            chat_id = await zaia_sessions.obter(phone)
+            if chat_id:
                 logger.info(f"Reutilizando chat_id existente para {phone}: {chat_id}")
             else:
                 # 1. Criar o chat
                 payload_chat = {
                     "agentId": settings.ZAIA_AGENT_ID
                 }
-                logger.info(f"Criando chat na Zaia: {url_chat} | Payload: {payload_chat}")
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url_chat, headers=headers, json=payload_chat) as resp_chat:
-                        chat_data = await resp_chat.json()
-                        logger.info(f"Resposta da criação do chat: {chat_data}")
-                        chat_id = chat_data.get("id")
-                        if not chat_id:
-                            return "Erro ao criar chat na Zaia.", False
-                        # Salva o chat_id no cache
-                        chat_context_cache[phone] = chat_id
+                logger.debug("Criando chat na Zaia: %s | Payload: %s", url_chat, resumo(payload_chat))
+                async with medir_etapa("zaia_chat"), session.post(url_chat, headers=headers, json=payload_chat) as resp_chat:
+                    chat_data = await resp_chat.json()
+                    logger.debug("Resposta da criação do chat: %s", resumo(chat_data))
+                    chat_id = chat_data.get("id")
+                    if not chat_id:
+                        return "Erro ao criar chat na Zaia.", False
             # 2. Criar a mensagem
-            # Buscar histórico do chat antes de enviar nova mensagem
-            historico = await self.buscar_historico_zaia(chat_id)
-            contexto = ""
-            for msg in historico[-5:]:  # Pega as últimas 5 mensagens
-                if msg["origin"] == "user":
-                    contexto += f"Usuário: {msg['text']}\n"
-                elif msg["origin"] == "assistant":
-                    contexto += f"Assistente: {msg['text']}\n"
-            prompt_com_contexto = f"{contexto}Usuário: {message}"
+            # Só a mensagem nova: a Zaia já guarda a conversa do chat reutilizado
             payload_message = {
                 "agentId": settings.ZAIA_AGENT_ID,
                 "externalGenerativeChatId": chat_id,
-                "prompt": prompt_com_contexto,
+                "prompt": message,
                 "custom": {"whatsapp": phone}
             }
-            logger.info(f"Enviando mensagem para Zaia: {url_message} | Payload: {payload_message}")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url_message, headers=headers, json=payload_message) as resp_msg:
-                    msg_data = await resp_msg.json()
-                    logger.info(f"Resposta do envio da mensagem: {msg_data}")
-                # 3. Buscar a resposta
-                for _ in range(10):
-                    retrieve_url = f"{url_retrieve}?externalGenerativeChatIds={chat_id}"
-                    async with session.get(retrieve_url, headers=headers) as resp_retrieve:
-                        try:
-                            retrieve_data = await resp_retrieve.json()
-                            logger.info(f"Buscando resposta da Zaia. Chat ID: {chat_id}, Resposta: {retrieve_data}")
-                            chats = retrieve_data.get("externalGenerativeChats", [])
-                            if chats:
-                                messages = chats[0].get("externalGenerativeMessages", [])
-                                for msg in reversed(messages):
-                                    if msg.get("origin") == "assistant" and msg.get("text"):
-                                        return msg["text"], False
-                        except Exception as e:
-                            raw_text = await resp_retrieve.text()
-                            logger.error(f"Erro ao decodificar JSON da resposta da Zaia (status {resp_retrieve.status}): {raw_text}")
-                            break
-                    await asyncio.sleep(2)
+            logger.debug("Enviando mensagem para Zaia: %s | Payload: %s", url_message, resumo(payload_message))
+            async with medir_etapa("zaia_mensagem"), session.post(url_message, headers=headers, json=payload_message) as resp_msg:
+                msg_data = await resp_msg.json()
+                logger.debug("Resposta do envio da mensagem: %s", resumo(msg_data))
+            # Registra/renova a sessão do telefone (compartilhada entre workers)
+            await zaia_sessions.salvar(phone, chat_id)
+            if msg_data.get("origin") == "assistant" and msg_data.get("text"):
+                # A Zaia já respondeu de forma síncrona no próprio envio
+                return msg_data["text"], False
+            # 3. Aguardar a resposta (polling agrupado com as demais conversas)
+            # A resposta deve ser mais nova que o prompt recém-criado
+            apos_id, apos_total = await self._corte_resposta_zaia(chat_id, message, msg_data)
+            async with medir_etapa("zaia_resposta"):
+                resposta = await zaia_poller.aguardar_resposta(chat_id, apos_id=apos_id, apos_total=apos_total)
+            if resposta:
+                return resposta, False
             return "Desculpe, estou com dificuldades para processar sua mensagem no momento. Por favor, tente novamente em alguns instantes.", False
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            return MENSAGEM_INSTABILIDADE, False
         except Exception as e:
             logger.error(f"Erro ao processar mensagem com Zaia: {str(e)}")
             return "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente em alguns instantes.", False
@@ -239,31 +268,17 @@ class WhatsAppService:
         Transcreve áudio usando OpenAI Whisper
         """
         try:
-            # Baixar o áudio
-            response = requests.get(audio_url)
-            response.raise_for_status()
-            
-            # Salvar temporariamente
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_file_path = temp_file.name
+            async with medir_etapa("transcricao"):
+                # Baixar o áudio para a memória (com limite de tamanho)
+                audio = await baixar_midia(audio_url, settings.AUDIO_MAX_BYTES)
             
-            # Transcrever usando OpenAI
-            try:
-                with open(temp_file_path, "rb") as audio_file:
-                    transcript = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language="pt"
-                    )
-                    return transcript.text
-            finally:
-                # Limpar arquivo temporário
-                try:
-                    os.remove(temp_file_path)
-                except:
-                    pass
+                # Transcrever usando OpenAI, enviando os bytes direto (sem arquivo temporário)
+                transcript = await http_clients.openai().audio.transcriptions.create(
+                    model="whisper-1",
+                    file=("audio.ogg", audio),
+                    language="pt"
+                )
+            return transcript.text
                     
         except Exception as e:
             logger.error(f"Erro ao transcrever áudio: {str(e)}")
@@ -351,11 +366,11 @@ class WhatsAppService:
         """
         try:
             url = f"{self.base_url}/phone-id/{numero}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("id")
+            session = http_clients.session("zapi")
+            async with session.get(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("id")
             return None
         except Exception as e:
             logger.error(f"Erro ao obter ID do telefone: {str(e)}")
@@ -364,23 +379,32 @@ class WhatsAppService:
     async def handle_incoming_message(self, webhook_data):
         """
         Processa mensagens recebidas e envia resposta
+        (mensagens seguidas do telefone são agrupadas, como em processar_mensagem_recebida)
         """
         try:
             # Processar webhook
             processed_data = await self.processar_webhook(webhook_data)
             if processed_data.get("error"):
                 return {"error": processed_data["error"]}
-                
-            # Processar mensagem com Zaia
-            resposta, usar_audio = await self.process_with_zaia(
-                processed_data["message"],
-                processed_data["aluno"],
-                processed_data.get("contexto"),
-                processed_data["phone"]
-            )
-            
-            # Enviar resposta
-            await self.enviar_resposta(processed_data["phone"], resposta, processed_data["type"])
+
+            async def responder(dados: Dict):
+                # Processar mensagem com Zaia
+                resposta, usar_audio = await self.process_with_zaia(
+                    dados["message"],
+                    dados["aluno"],
+                    dados.get("contexto"),
+                    dados["phone"]
+                )
+
+                # Enviar resposta
+                await self.enviar_resposta(dados["phone"], resposta, dados["type"])
+
+            phone = processed_data["phone"]
+            if processed_data.get("contexto"):
+                await message_coalescer.descarregar(phone)
+                await responder(processed_data)
+            else:
+                await message_coalescer.adicionar(phone, processed_data, responder)
             
             return {"success": True}
             
@@ -388,6 +412,70 @@ class WhatsAppService:
             logger.error(f"Erro ao processar mensagem: {str(e)}")
             return {"error": str(e)}
             
+    async def processar_mensagem_recebida(self, webhook_data: Dict) -> Dict:
+        """
+        Pipeline completo de uma mensagem já validada pelo endpoint
+        /api/whatsapp/webhook: identifica o aluno e extrai o texto; a consulta
+        à Zaia e a resposta (em áudio quando a mensagem original foi áudio)
+        são feitas por lote de mensagens seguidas do telefone
+        """
+        phone = webhook_data.get("phone")
+        resultado = await self.processar_webhook(webhook_data)
+
+        if resultado.get("error"):
+            logger.error(f"Erro no processamento do webhook: {resultado['error']}")
+            if resultado["error"] == "Aluno não encontrado":
+                # Enviar mensagem educada informando que não foi encontrado
+                await self.enviar_mensagem_texto(
+                    phone,
+                    "Olá! Não consegui encontrar seu cadastro. Por favor, verifique se seu número está registrado corretamente no sistema."
+                )
+            elif resultado["error"] == "Serviço indisponível":
+                await self.enviar_mensagem_texto(phone, resultado["message"])
+            return {"error": resultado["error"]}
+
+        # Comprovantes e erros do Flexge têm fluxo próprio: não entram em lote
+        if resultado.get("contexto"):
+            await message_coalescer.descarregar(phone)
+            return await self.responder_mensagem(resultado)
+
+        await message_coalescer.adicionar(phone, resultado, self.responder_mensagem)
+        return {"success": True}
+
+    async def responder_mensagem(self, resultado: Dict) -> Dict:
+        """
+        Consulta a Zaia com a mensagem (ou lote de mensagens) processada e envia a resposta
+        """
+        phone = resultado.get("phone")
+
+        # Processar a mensagem com a Zaia
+        logger.info("Processando mensagem com Zaia: %s", resumo(resultado))
+        resposta, usar_audio = await self.process_with_zaia(
+            resultado.get("message", ""),
+            resultado.get("aluno"),
+            resultado.get("contexto"),
+            resultado.get("phone", phone)
+        )
+        logger.info("Resposta da Zaia: %s, usar_audio: %s", resumo(resposta, texto_livre=True), usar_audio)
+
+        # Enviar resposta
+        if (usar_audio or resultado.get("type") == "audio") and settings.ELEVENLABS_API_KEY:
+            try:
+                # Converter texto em áudio
+                audio_data = await text_to_speech(resposta)
+                if audio_data:
+                    await self.enviar_audio(phone, audio_data)
+                else:
+                    await self.enviar_mensagem_texto(phone, resposta)
+            except Exception as e:
+                logger.error(f"Erro ao processar áudio: {str(e)}")
+                await self.enviar_mensagem_texto(phone, resposta)
+        else:
+            logger.info(f"Enviando resposta como texto para {phone}")
+            await self.enviar_mensagem_texto(phone, resposta)
+
+        return {"success": True}
+
     async def enviar_resposta(self, phone: str, resposta: str, tipo_mensagem_original: str):
         """
         Envia resposta ao usuário, decidindo entre texto ou áudio
@@ -411,26 +499,42 @@ class WhatsAppService:
             else:
                 raise e 
 
+    async def _corte_resposta_zaia(self, chat_id: int, message: str, msg_data: Dict) -> Tuple[Optional[int], int]:
+        """
+        Ponto a partir do qual uma mensagem do assistente é a resposta ao
+        prompt enviado: (apos_id, apos_total) para zaia_poller.aguardar_resposta
+        """
+        if msg_data.get("origin") == "user" and isinstance(msg_data.get("id"), int):
+            return msg_data["id"], 0
+        # Envio sem o id do prompt: localiza o prompt no histórico do chat
+        historico = await self.buscar_historico_zaia(chat_id)
+        for posicao in range(len(historico) - 1, -1, -1):
+            msg = historico[posicao]
+            if msg["origin"] == "user" and msg["text"] == message:
+                apos_id = msg["id"] if isinstance(msg["id"], int) else None
+                return apos_id, posicao + 1
+        return None, len(historico)
+
     async def buscar_historico_zaia(self, chat_id: int) -> list:
         """
         Busca o histórico completo de mensagens de um chat na Zaia.
-        Retorna uma lista de dicionários com origin e text.
+        Retorna uma lista de dicionários com id, origin e text.
         """
         url_retrieve = f"{settings.ZAIA_API_URL}/v1.1/api/external-generative-message/retrieve-multiple?externalGenerativeChatIds={chat_id}"
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {settings.ZAIA_API_KEY}"
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url_retrieve, headers=headers) as resp:
-                try:
-                    data = await resp.json()
-                    chats = data.get("externalGenerativeChats", [])
-                    if chats:
-                        messages = chats[0].get("externalGenerativeMessages", [])
-                        return [{"origin": m.get("origin"), "text": m.get("text")} for m in messages]
-                    return []
-                except Exception as e:
-                    raw_text = await resp.text()
-                    logger.error(f"Erro ao buscar histórico da Zaia (status {resp.status}): {raw_text}")
-                    return [] 
\ No newline at end of file
+        session = http_clients.session("zaia")
+        async with session.get(url_retrieve, headers=headers) as resp:
+            try:
+                data = await resp.json()
+                chats = data.get("externalGenerativeChats", [])
+                if chats:
+                    messages = chats[0].get("externalGenerativeMessages", [])
+                    return [{"id": m.get("id"), "origin": m.get("origin"), "text": m.get("text")} for m in messages]
+                return []
+            except Exception as e:
+                raw_text = await resp.text()
+                logger.error(f"Erro ao buscar histórico da Zaia (status {resp.status}): {raw_text}")
+                return []
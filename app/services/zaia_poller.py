@@ -0,0 +1,180 @@
+"""
+Poller central de respostas da Zaia.
+
+Em vez de cada conversa consultar retrieve-multiple sozinha a cada 2s,
+todas as conversas aguardando resposta são consultadas juntas em uma
+única requisição por tick (externalGenerativeChatIds=1,2,3...). O
+intervalo entre ticks começa curto e cresce com a idade da espera mais
+recente; cada conversa é liberada assim que surge uma mensagem do
+assistente mais nova que o prompt enviado.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.config import settings
+from app.core.http_client import http_clients
+
+logger = logging.getLogger(__name__)
+
+
+class _Espera:
+    __slots__ = ("future", "apos_id", "apos_total", "inicio")
+
+    def __init__(self, future: asyncio.Future, apos_id: Optional[int], apos_total: int):
+        self.future = future
+        self.apos_id = apos_id
+        self.apos_total = apos_total
+        self.inicio = time.monotonic()
+
+    def intervalo(self) -> float:
+        """
+        Intervalo de polling desejado para esta espera (backoff pela idade)
+        """
+        idade = time.monotonic() - self.inicio
+        intervalo = settings.ZAIA_POLL_MIN_INTERVAL
+        decorrido = 0.0
+        while decorrido + intervalo < idade and intervalo < settings.ZAIA_POLL_MAX_INTERVAL:
+            decorrido += intervalo
+            intervalo *= settings.ZAIA_POLL_BACKOFF
+        return min(intervalo, settings.ZAIA_POLL_MAX_INTERVAL)
+
+    def resposta(self, messages: List[Dict]) -> Optional[str]:
+        """
+        Retorna o texto da primeira mensagem do assistente posterior ao prompt
+        """
+        for posicao, msg in enumerate(messages):
+            if msg.get("origin") != "assistant" or not msg.get("text"):
+                continue
+            msg_id = msg.get("id")
+            if self.apos_id is not None and isinstance(msg_id, int):
+                if msg_id > self.apos_id:
+                    return msg["text"]
+            elif posicao >= self.apos_total:
+                return msg["text"]
+        return None
+
+
+class ZaiaReplyPoller:
+    """
+    Agrupa o polling de todas as conversas pendentes em requisições únicas
+    """
+
+    def __init__(self):
+        # chat_id (como str) -> esperas
+        self._pendentes: Dict[str, List[_Espera]] = {}
+        self._tarefa: Optional[asyncio.Task] = None
+        self._novo_pendente = asyncio.Event()
+
+    @property
+    def pendentes(self) -> int:
+        return sum(len(esperas) for esperas in self._pendentes.values())
+
+    async def aguardar_resposta(
+        self,
+        chat_id: int,
+        apos_id: Optional[int] = None,
+        apos_total: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Aguarda a resposta do assistente no chat.
+        apos_id: maior id de mensagem existente antes do prompt (se conhecido)
+        apos_total: quantidade de mensagens antes do prompt (fallback sem ids)
+        Retorna None se a resposta não chegar dentro do timeout; levanta
+        CircuitOpenError se o circuito da Zaia abrir durante a espera.
+        """
+        future = asyncio.get_running_loop().create_future()
+        espera = _Espera(future, apos_id, apos_total)
+        chave = str(chat_id)
+        self._pendentes.setdefault(chave, []).append(espera)
+        self._novo_pendente.set()
+        self._garantir_loop()
+        try:
+            return await asyncio.wait_for(future, timeout or settings.ZAIA_REPLY_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout aguardando resposta da Zaia. Chat ID: {chat_id}")
+            return None
+        finally:
+            esperas = self._pendentes.get(chave)
+            if esperas and espera in esperas:
+                esperas.remove(espera)
+                if not esperas:
+                    del self._pendentes[chave]
+
+    def _garantir_loop(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.ensure_future(self._loop())
+
+    async def _loop(self):
+        while self._pendentes:
+            intervalo = min(e.intervalo() for esperas in self._pendentes.values() for e in esperas)
+            self._novo_pendente.clear()
+            try:
+                # Uma nova conversa pendente encurta a espera do próximo tick
+                await asyncio.wait_for(self._novo_pendente.wait(), intervalo)
+                await asyncio.sleep(settings.ZAIA_POLL_MIN_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if self._pendentes:
+                await self._tick()
+
+    async def _tick(self):
+        chat_ids = list(self._pendentes)
+        lote = settings.ZAIA_POLL_BATCH_SIZE
+        await asyncio.gather(*[
+            self._consultar(chat_ids[i:i + lote]) for i in range(0, len(chat_ids), lote)
+        ])
+
+    async def _consultar(self, chat_ids: List[str]):
+        url = f"{settings.ZAIA_API_URL}/v1.1/api/external-generative-message/retrieve-multiple"
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {settings.ZAIA_API_KEY}"
+        }
+        params = {"externalGenerativeChatIds": ",".join(chat_ids)}
+        try:
+            session = http_clients.session("zaia")
+            async with session.get(url, headers=headers, params=params) as resp:
+                if resp.status != 200:
+                    logger.error(f"Erro no polling da Zaia (status {resp.status}): {await resp.text()}")
+                    return
+                data = await resp.json()
+        except CircuitOpenError as e:
+            # Breaker da Zaia aberto: libera as esperas agora em vez de deixá-las até o timeout
+            logger.warning(str(e))
+            self._falhar(chat_ids, e)
+            return
+        except Exception as e:
+            logger.error(f"Erro no polling da Zaia: {str(e)}")
+            return
+
+        for chat in data.get("externalGenerativeChats", []):
+            esperas = self._pendentes.get(str(chat.get("id")))
+            if not esperas:
+                continue
+            messages = chat.get("externalGenerativeMessages", [])
+            for espera in list(esperas):
+                texto = espera.resposta(messages)
+                if texto and not espera.future.done():
+                    espera.future.set_result(texto)
+
+    def _falhar(self, chat_ids: List[str], erro: Exception):
+        for chat_id in chat_ids:
+            for espera in self._pendentes.get(chat_id, []):
+                if not espera.future.done():
+                    espera.future.set_exception(erro)
+
+    async def parar(self):
+        if self._tarefa is not None and not self._tarefa.done():
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+        self._tarefa = None
+
+
+zaia_poller = ZaiaReplyPoller()
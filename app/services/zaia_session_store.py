@@ -0,0 +1,152 @@
+"""
+Store de sessões da Zaia: telefone -> chat_id.
+
+Uma conversa reaproveita o mesmo chat enquanto houver atividade dentro
+de ZAIA_SESSION_INACTIVITY segundos. Com DATABASE_URL em SQLite, as
+sessões são compartilhadas entre workers e sobrevivem a restarts; caso
+contrário ficam num LRU em memória. Em ambos os casos o store é limitado
+a ZAIA_SESSION_MAXSIZE telefones.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import SQLiteConnection, sqlite_path
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS zaia_sessions (
+    phone TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_zaia_sessions_updated_at ON zaia_sessions (updated_at);
+"""
+
+# A cada N gravações, remove sessões expiradas e excedentes do SQLite
+_PODA_A_CADA = 200
+
+
+def _chat_id(valor: str):
+    # A Zaia usa ids numéricos; o store guarda como texto
+    return int(valor) if valor.isdigit() else valor
+
+
+class ZaiaSessionStore:
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        inatividade: Optional[float] = None,
+        maxsize: Optional[int] = None,
+    ):
+        self.inatividade = inatividade if inatividade is not None else settings.ZAIA_SESSION_INACTIVITY
+        self.maxsize = maxsize if maxsize is not None else settings.ZAIA_SESSION_MAXSIZE
+        path = sqlite_path(database_url)
+        self._db: Optional[SQLiteConnection] = SQLiteConnection(path) if path else None
+        self._schema_criado = False
+        self._memoria: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._gravacoes = 0
+
+    # --- SQLite (executado em thread) -------------------------------------
+
+    def _garantir_schema(self):
+        if not self._schema_criado:
+            self._db.executescript(_SCHEMA)
+            self._schema_criado = True
+
+    def _obter_sqlite(self, phone: str, limite: float) -> Optional[str]:
+        self._garantir_schema()
+        rows = self._db.execute(
+            "SELECT chat_id FROM zaia_sessions WHERE phone = ? AND updated_at >= ?",
+            (phone, limite),
+        )
+        return rows[0][0] if rows else None
+
+    def _salvar_sqlite(self, phone: str, chat_id: str, agora: float):
+        self._garantir_schema()
+        self._db.execute(
+            "INSERT INTO zaia_sessions (phone, chat_id, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(phone) DO UPDATE SET chat_id = excluded.chat_id, updated_at = excluded.updated_at",
+            (phone, chat_id, agora),
+        )
+        self._gravacoes += 1
+        if self._gravacoes % _PODA_A_CADA == 0:
+            self._db.execute("DELETE FROM zaia_sessions WHERE updated_at < ?", (agora - self.inatividade,))
+            self._db.execute(
+                "DELETE FROM zaia_sessions WHERE phone NOT IN "
+                "(SELECT phone FROM zaia_sessions ORDER BY updated_at DESC LIMIT ?)",
+                (self.maxsize,),
+            )
+
+    def _remover_sqlite(self, phone: str):
+        self._garantir_schema()
+        self._db.execute("DELETE FROM zaia_sessions WHERE phone = ?", (phone,))
+
+    # --- API ---------------------------------------------------------------
+
+    async def obter(self, phone: str):
+        """
+        Retorna o chat_id ativo do telefone, se houver atividade recente
+        """
+        if not phone:
+            return None
+        limite = time.time() - self.inatividade
+        if self._db is not None:
+            try:
+                chat_id = await asyncio.to_thread(self._obter_sqlite, phone, limite)
+                return _chat_id(chat_id) if chat_id else None
+            except Exception as e:
+                logger.error(f"Erro ao ler sessão da Zaia no SQLite: {str(e)}")
+                return None
+
+        entrada = self._memoria.get(phone)
+        if entrada is None:
+            return None
+        chat_id, atualizado_em = entrada
+        if atualizado_em < limite:
+            del self._memoria[phone]
+            return None
+        self._memoria.move_to_end(phone)
+        return _chat_id(chat_id)
+
+    async def salvar(self, phone: str, chat_id) -> None:
+        """
+        Registra (ou renova) a sessão do telefone
+        """
+        if not phone or not chat_id:
+            return
+        agora = time.time()
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._salvar_sqlite, phone, str(chat_id), agora)
+            except Exception as e:
+                logger.error(f"Erro ao gravar sessão da Zaia no SQLite: {str(e)}")
+            return
+
+        self._memoria[phone] = (str(chat_id), agora)
+        self._memoria.move_to_end(phone)
+        while len(self._memoria) > self.maxsize:
+            self._memoria.popitem(last=False)
+
+    async def remover(self, phone: str) -> None:
+        """
+        Encerra a sessão do telefone (o próximo prompt cria um novo chat)
+        """
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._remover_sqlite, phone)
+            except Exception as e:
+                logger.error(f"Erro ao remover sessão da Zaia no SQLite: {str(e)}")
+            return
+        self._memoria.pop(phone, None)
+
+    def fechar(self):
+        if self._db is not None:
+            self._db.close()
+
+
+zaia_sessions = ZaiaSessionStore()
@@ -0,0 +1,176 @@
+"""
+Despachante de envios ao Z-API.
+
+Todo envio (texto ou áudio) passa por aqui:
+- ordem por telefone: os envios de um mesmo telefone saem um por vez, na
+  ordem em que foram pedidos (WebhookJobQueue "zapi"); telefones
+  diferentes são atendidos em paralelo por ZAPI_DISPATCH_WORKERS workers;
+- token bucket da instância: no máximo ZAPI_RATE_LIMIT POSTs por segundo,
+  com rajadas de até ZAPI_RATE_BURST;
+- retentativas: respostas 429/5xx e falhas de conexão são repetidas até
+  ZAPI_MAX_RETRIES vezes, com backoff exponencial e jitter;
+- backpressure: acima de ZAPI_QUEUE_MAXSIZE envios pendentes, novos
+  envios falham na hora em vez de acumular sem limite.
+
+Cada envio é uma lista de passos (ex.: os pedaços de um texto longo); um
+passo que falha em definitivo interrompe os seguintes, para não entregar
+uma resposta pela metade fora de ordem.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import ETAPA_DURACAO, ZAPI_RETENTATIVAS, registrar_fila
+from app.services.webhook_queue import WebhookJobQueue
+
+logger = logging.getLogger(__name__)
+
+# Um passo faz um único POST e retorna {"success": True} ou {"error": ..., "status": ...}
+Passo = Callable[[], Awaitable[Dict]]
+
+_ATRASO_MAXIMO = 10.0
+
+
+def dividir_texto(texto: str, limite: Optional[int] = None) -> List[str]:
+    """
+    Divide o texto em pedaços de até `limite` caracteres, cortando de
+    preferência em parágrafos, depois em linhas, frases e espaços
+    """
+    limite = limite or settings.ZAPI_MAX_TEXT_LENGTH
+    pedacos = []
+    while len(texto) > limite:
+        corte = -1
+        for separador in ("\n\n", "\n", ". ", " "):
+            posicao = texto.rfind(separador, 0, limite)
+            if posicao >= limite // 2:
+                corte = posicao + len(separador)
+                break
+        if corte <= 0:
+            corte = limite
+        pedaco = texto[:corte].rstrip()
+        if pedaco:
+            pedacos.append(pedaco)
+        texto = texto[corte:].lstrip()
+    if texto or not pedacos:
+        pedacos.append(texto)
+    return pedacos
+
+
+def deve_repetir(resultado: Dict) -> bool:
+    if resultado.get("circuito_aberto"):
+        # Circuit breaker do Z-API aberto: repetir agora só geraria outra recusa
+        return False
+    status = resultado.get("status")
+    return status is None or status == 429 or status >= 500
+
+
+class TokenBucket:
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = max(1.0, capacidade)
+        self._tokens = self.capacidade
+        self._atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        """
+        Aguarda um token (em ordem de chegada)
+        """
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.taxa)
+
+
+class ZAPIDispatcher:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        maxsize: Optional[int] = None,
+        taxa: Optional[float] = None,
+        rajada: Optional[float] = None,
+        max_tentativas: Optional[int] = None,
+    ):
+        self._fila = WebhookJobQueue(
+            workers=workers or settings.ZAPI_DISPATCH_WORKERS,
+            maxsize=maxsize or settings.ZAPI_QUEUE_MAXSIZE,
+            nome="zapi",
+        )
+        self._bucket = TokenBucket(taxa or settings.ZAPI_RATE_LIMIT, rajada or settings.ZAPI_RATE_BURST)
+        self.max_tentativas = max_tentativas if max_tentativas is not None else settings.ZAPI_MAX_RETRIES
+        self.enviados = 0
+        self.falhas = 0
+        self.retentativas = 0
+
+    async def _executar_passo(self, passo: Passo) -> Dict:
+        tentativa = 0
+        while True:
+            await self._bucket.adquirir()
+            resultado = await passo()
+            if resultado.get("success") or not deve_repetir(resultado) or tentativa >= self.max_tentativas:
+                return resultado
+            atraso = random.uniform(0, min(_ATRASO_MAXIMO, settings.ZAPI_RETRY_BASE_DELAY * 2 ** tentativa))
+            tentativa += 1
+            self.retentativas += 1
+            ZAPI_RETENTATIVAS.labels(str(resultado.get("status") or "erro")).inc()
+            logger.warning(
+                f"Z-API falhou (status={resultado.get('status')}), "
+                f"tentativa {tentativa}/{self.max_tentativas} em {atraso:.2f}s"
+            )
+            await asyncio.sleep(atraso)
+
+    async def enviar(self, phone: str, passos: List[Passo]) -> Dict:
+        """
+        Enfileira os passos do envio para o telefone e aguarda o resultado
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        enfileirado_em = time.perf_counter()
+
+        async def job():
+            ETAPA_DURACAO.labels("zapi_fila").observe(time.perf_counter() - enfileirado_em)
+            resultado: Dict = {"error": "Envio ao Z-API interrompido"}
+            try:
+                for passo in passos:
+                    resultado = await self._executar_passo(passo)
+                    if not resultado.get("success"):
+                        break
+            except Exception as e:
+                resultado = {"error": str(e)}
+            finally:
+                if resultado.get("success"):
+                    self.enviados += 1
+                else:
+                    self.falhas += 1
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+        if not self._fila.enfileirar(phone, job):
+            self.falhas += 1
+            return {"error": "Fila de envio do Z-API cheia"}
+        return await futuro
+
+    def metricas(self) -> Dict[str, int]:
+        return {
+            **self._fila.metricas(),
+            "enviados": self.enviados,
+            "falhas_envio": self.falhas,
+            "retentativas": self.retentativas,
+        }
+
+    async def iniciar(self):
+        await self._fila.iniciar()
+
+    async def parar(self):
+        await self._fila.parar()
+
+
+zapi_dispatcher = ZAPIDispatcher()
+registrar_fila("zapi", lambda: zapi_dispatcher._fila.pendentes)
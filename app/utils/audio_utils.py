@@ -0,0 +1,120 @@
+"""
+Transcodificação de áudio com ffmpeg, sem arquivos temporários.
+
+O áudio entra pelo stdin e sai pelo stdout do ffmpeg, rodando como
+subprocesso assíncrono: o event loop continua livre durante a conversão.
+O número de ffmpegs simultâneos é limitado por FFMPEG_MAX_CONCURRENCY e
+cada conversão tem timeout de FFMPEG_TIMEOUT segundos.
+
+transcodificar_stream_para_ogg() recebe o áudio em pedaços (por exemplo,
+direto do corpo de uma resposta HTTP em streaming) e os escreve no ffmpeg
+à medida que chegam, sobrepondo download e codificação. Nesse modo o
+timeout conta a partir do fim da entrada.
+"""
+import asyncio
+import logging
+from typing import AsyncIterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import medir_etapa
+
+logger = logging.getLogger(__name__)
+
+# OGG/Vorbis para notas de voz do WhatsApp
+ARGS_OGG_VORBIS = ['-c:a', 'libvorbis', '-q:a', '4', '-f', 'ogg']
+
+_limite_ffmpeg = asyncio.Semaphore(settings.FFMPEG_MAX_CONCURRENCY)
+
+
+class TranscodeError(Exception):
+    pass
+
+
+async def _encerrar(proc: asyncio.subprocess.Process):
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+
+async def _iniciar_ffmpeg(formato_entrada: str) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        settings.FFMPEG_PATH, '-loglevel', 'error',
+        '-f', formato_entrada, '-i', 'pipe:0',
+        *ARGS_OGG_VORBIS, 'pipe:1',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+
+async def _ler_saidas(proc: asyncio.subprocess.Process) -> Tuple[bytes, bytes]:
+    stdout, stderr = await asyncio.gather(proc.stdout.read(), proc.stderr.read())
+    await proc.wait()
+    return stdout, stderr
+
+
+def _verificar_saida(proc: asyncio.subprocess.Process, stdout: bytes, stderr: bytes) -> bytes:
+    if proc.returncode != 0:
+        raise TranscodeError(stderr.decode(errors="replace").strip() or f"ffmpeg saiu com código {proc.returncode}")
+    return stdout
+
+
+async def transcodificar_para_ogg(audio: bytes, formato_entrada: str = "mp3", timeout: Optional[float] = None) -> bytes:
+    """
+    Converte o áudio (por padrão MP3) para OGG/Vorbis via pipes do ffmpeg
+    """
+    timeout = timeout if timeout is not None else settings.FFMPEG_TIMEOUT
+    async with _limite_ffmpeg, medir_etapa("ffmpeg"):
+        proc = await _iniciar_ffmpeg(formato_entrada)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(audio), timeout)
+        except asyncio.TimeoutError:
+            await _encerrar(proc)
+            raise TranscodeError(f"ffmpeg excedeu o timeout de {timeout}s")
+        except BaseException:
+            await _encerrar(proc)
+            raise
+
+    return _verificar_saida(proc, stdout, stderr)
+
+
+async def transcodificar_stream_para_ogg(
+    pedacos: AsyncIterable[bytes],
+    formato_entrada: str = "mp3",
+    timeout: Optional[float] = None,
+) -> bytes:
+    """
+    Converte para OGG/Vorbis um áudio recebido em pedaços, alimentando o
+    ffmpeg enquanto a entrada ainda está chegando.
+    Erros da fonte dos pedaços (ex.: timeout do HTTP) são propagados.
+    """
+    timeout = timeout if timeout is not None else settings.FFMPEG_TIMEOUT
+    async with _limite_ffmpeg, medir_etapa("ffmpeg"):
+        proc = await _iniciar_ffmpeg(formato_entrada)
+        # stdout e stderr são lidos em paralelo à escrita para o pipe não travar
+        leitura = asyncio.ensure_future(_ler_saidas(proc))
+        try:
+            recebidos = 0
+            try:
+                async for pedaco in pedacos:
+                    recebidos += len(pedaco)
+                    proc.stdin.write(pedaco)
+                    await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # ffmpeg encerrou antes do fim da entrada; o motivo vem no stderr
+                pass
+            proc.stdin.close()
+            logger.debug(f"Entrada do ffmpeg concluída ({recebidos} bytes)")
+            try:
+                stdout, stderr = await asyncio.wait_for(asyncio.shield(leitura), timeout)
+            except asyncio.TimeoutError:
+                raise TranscodeError(f"ffmpeg excedeu o timeout de {timeout}s")
+        except BaseException:
+            leitura.cancel()
+            await _encerrar(proc)
+            raise
+
+    return _verificar_saida(proc, stdout, stderr)
@@ -0,0 +1,43 @@
+"""
+Download de mídias recebidas pelo WhatsApp (áudios, imagens, documentos).
+
+O corpo é lido em pedaços direto para a memória, com limite de tamanho:
+o download é abortado assim que passa de max_bytes (ou antes, se o
+Content-Length já indicar isso), sem tocar o disco.
+"""
+import logging
+
+import aiohttp
+
+from app.core.http_client import http_clients
+
+logger = logging.getLogger(__name__)
+
+_TAMANHO_PEDACO = 64 * 1024
+
+
+class MediaDownloadError(Exception):
+    pass
+
+
+async def baixar_midia(url: str, max_bytes: int) -> bytes:
+    """
+    Baixa a mídia da URL e retorna seus bytes.
+    Levanta MediaDownloadError se o download falhar ou exceder max_bytes.
+    """
+    session = http_clients.session("media")
+    try:
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise MediaDownloadError(f"Download da mídia falhou com status {response.status}")
+            if response.content_length is not None and response.content_length > max_bytes:
+                raise MediaDownloadError(f"Mídia de {response.content_length} bytes excede o limite de {max_bytes}")
+
+            buffer = bytearray()
+            async for pedaco in response.content.iter_chunked(_TAMANHO_PEDACO):
+                buffer.extend(pedaco)
+                if len(buffer) > max_bytes:
+                    raise MediaDownloadError(f"Mídia excede o limite de {max_bytes} bytes")
+            return bytes(buffer)
+    except aiohttp.ClientError as e:
+        raise MediaDownloadError(f"Erro ao baixar mídia: {str(e)}") from e
@@ -1,14 +1,17 @@
-import aiohttp
+from app.core.circuit_breaker import CircuitOpenError
 from app.core.config import settings
+from app.core.http_client import http_clients
+from app.core.logs import resumo
+from app.core.media_store import media_store
+from app.core.metrics import medir_etapa
+from app.services.zapi_dispatcher import zapi_dispatcher, dividir_texto, deve_repetir
+import functools
 import logging
 import base64
 
 logger = logging.getLogger(__name__)
 
-async def enviar_mensagem_zapi(numero, mensagem):
-    """
-    Envia uma mensagem de texto via Z-API.
-    """
+async def _post_texto_zapi(numero: str, mensagem: str):
     url = f"https://api.z-api.io/instances/{settings.ZAPI_INSTANCE_ID}/token/{settings.ZAPI_TOKEN}/send-text"
     payload = {
         "phone": numero,
@@ -19,61 +22,98 @@ async def enviar_mensagem_zapi(numero, mensagem):
         "Client-Token": settings.ZAPI_SECURITY_TOKEN,
     }
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info(f"Enviando mensagem para {numero}. URL: {url}")
-            logger.info(f"Payload: {payload}")
-            async with session.post(url, headers=headers, json=payload) as response:
-                response_text = await response.text()
-                logger.info(f"Resposta do Z-API: Status={response.status}, Body={response_text}")
-                if response.status == 200:
-                    logger.info(f"Mensagem enviada para {numero}")
-                    return {"success": True}
-                else:
-                    error_text = f"Status: {response.status}, Response: {response_text}"
-                    logger.error(f"Erro ao enviar mensagem: {error_text}")
-                    return {"error": error_text}
-        except Exception as e:
-            logger.error(f"Exceção ao enviar mensagem: {str(e)}")
-            return {"error": str(e)}
+    session = http_clients.session("zapi")
+    try:
+        logger.info("Enviando mensagem para %s", numero)
+        logger.debug("Payload: %s", resumo(payload))
+        async with medir_etapa("zapi_envio"), session.post(url, headers=headers, json=payload) as response:
+            response_text = await response.text()
+            logger.debug("Resposta do Z-API: Status=%s, Body=%s", response.status, resumo(response_text))
+            if response.status == 200:
+                logger.info(f"Mensagem enviada para {numero}")
+                return {"success": True}
+            else:
+                error_text = f"Status: {response.status}, Response: {response_text}"
+                logger.error(f"Erro ao enviar mensagem: {error_text}")
+                return {"error": error_text, "status": response.status}
+    except CircuitOpenError as e:
+        logger.warning(str(e))
+        return {"error": str(e), "circuito_aberto": True}
+    except Exception as e:
+        logger.error(f"Exceção ao enviar mensagem: {str(e)}")
+        return {"error": str(e)}
 
-async def enviar_audio_zapi(numero: str, audio_bytes: bytes):
+async def enviar_mensagem_zapi(numero, mensagem):
     """
-    Envia um áudio via Z-API.
-    O áudio deve estar em formato OGG ou MP3 (preferencialmente OGG para WhatsApp PTT).
+    Envia uma mensagem de texto via Z-API (pelo despachante: fila por
+    telefone, limite de taxa e retentativas). Textos acima de
+    ZAPI_MAX_TEXT_LENGTH saem em pedaços, na ordem.
     """
+    passos = [
+        functools.partial(_post_texto_zapi, numero, pedaco)
+        for pedaco in dividir_texto(mensagem or "")
+    ]
+    return await zapi_dispatcher.enviar(numero, passos)
+
+async def _post_audio_zapi(numero: str, audio: str, tamanho: int, modo: str):
     url = f"https://api.z-api.io/instances/{settings.ZAPI_INSTANCE_ID}/token/{settings.ZAPI_TOKEN}/send-audio"
-    try:
-        # Codificar o áudio em base64 e adicionar o prefixo conforme documentação
-        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-        audio_data_url = f"data:audio/ogg;base64,{audio_base64}"
+    payload = {
+        "phone": numero,
+        "audio": audio,
+        "viewOnce": False,
+        "waveform": True
+    }
 
-        payload = {
-            "phone": numero,
-            "audio": audio_data_url,
-            "viewOnce": False,
-            "waveform": True
-        }
+    headers = {
+        "Content-Type": "application/json",
+        "Client-Token": settings.ZAPI_SECURITY_TOKEN
+    }
 
-        headers = {
-            "Content-Type": "application/json",
-            "Client-Token": settings.ZAPI_SECURITY_TOKEN
-        }
+    session = http_clients.session("zapi")
+    logger.info("Enviando áudio para %s (%d bytes, %s)", numero, tamanho, modo)
+    logger.debug("Payload: %s", resumo(payload))
+    async with medir_etapa("zapi_envio"), session.post(url, headers=headers, json=payload) as response:
+        response_text = await response.text()
+        logger.debug("Resposta do Z-API (áudio): Status=%s, Body=%s", response.status, resumo(response_text))
+        if response.status == 200:
+            logger.info(f"Áudio enviado para {numero}")
+            return {"success": True}
+        else:
+            error_text = f"Status: {response.status}, Response: {response_text}"
+            logger.error(f"Erro ao enviar áudio: {error_text}")
+            return {"error": error_text, "status": response.status}
 
-        async with aiohttp.ClientSession() as session:
-            logger.info(f"Enviando áudio para {numero}. URL: {url}")
-            logger.info(f"Payload: {payload}")
-            async with session.post(url, headers=headers, json=payload) as response:
-                response_text = await response.text()
-                logger.info(f"Resposta do Z-API (áudio): Status={response.status}, Body={response_text}")
-                if response.status == 200:
-                    logger.info(f"Áudio enviado para {numero}")
-                    return {"success": True}
-                else:
-                    error_text = f"Status: {response.status}, Response: {response_text}"
-                    logger.error(f"Erro ao enviar áudio: {error_text}")
-                    return {"error": error_text}
-    except Exception as e:
-        logger.error(f"Exceção ao enviar áudio: {str(e)}")
-        return {"error": str(e)}
+async def enviar_audio_zapi(numero: str, audio_bytes: bytes):
+    """
+    Envia um áudio via Z-API (pelo despachante, como os textos).
+    O áudio deve estar em formato OGG ou MP3 (preferencialmente OGG para WhatsApp PTT).
+    Com ZAPI_AUDIO_DELIVERY=url o Z-API recebe uma URL assinada de /api/media;
+    se a publicação falhar ou o Z-API recusar a URL, o áudio segue em base64.
+    """
+    audio_url = None
+    if settings.ZAPI_AUDIO_DELIVERY == "url" and media_store.habilitado:
+        try:
+            audio_url = await media_store.publicar(audio_bytes, "ogg")
+        except Exception as e:
+            logger.error(f"Erro ao publicar áudio: {str(e)}")
+
+    async def enviar():
+        try:
+            if audio_url:
+                resultado = await _post_audio_zapi(numero, audio_url, len(audio_bytes), "url")
+                # 429/5xx: o despachante repete; outras recusas caem para base64
+                if resultado.get("success") or deve_repetir(resultado):
+                    return resultado
+                logger.warning(f"Reenviando áudio para {numero} em base64")
+
+            # Codificar o áudio em base64 e adicionar o prefixo conforme documentação
+            audio_data_url = "data:audio/ogg;base64," + base64.b64encode(audio_bytes).decode('ascii')
+            return await _post_audio_zapi(numero, audio_data_url, len(audio_bytes), "base64")
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            return {"error": str(e), "circuito_aberto": True}
+        except Exception as e:
+            logger.error(f"Exceção ao enviar áudio: {str(e)}")
+            return {"error": str(e)}
 
+    return await zapi_dispatcher.enviar(numero, [enviar])
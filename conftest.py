@@ -0,0 +1,11 @@
+import os
+
+# Credenciais obrigatórias em app.core.config: valores fictícios para importar o app nos testes
+for _variavel in (
+    "FLEXGE_API_KEY", "OPENAI_API_KEY", "SMTP_USER", "SMTP_PASSWORD", "ZAIA_API_KEY",
+    "ASAAS_API_KEY", "ZAPI_INSTANCE_ID", "ZAPI_TOKEN", "ZAPI_SECURITY_TOKEN",
+    "NOTION_API_KEY", "NOTION_DATABASE_ID",
+):
+    os.environ.setdefault(_variavel, "teste")
+# Sem SQLite: os stores persistentes funcionam só em memória
+os.environ.setdefault("DATABASE_URL", "")
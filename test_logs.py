@@ -0,0 +1,27 @@
+from app.core.logs import redigir, resumo
+
+
+def test_cpf_sem_pontuacao_no_texto_da_mensagem_e_mascarado():
+    webhook = {
+        "phone": "11987654321",
+        "type": "ReceivedCallback",
+        "text": {"message": "meu cpf é 12345678909, preciso do boleto"},
+    }
+
+    redigido = redigir(webhook)
+
+    assert redigido["phone"] == "11987654321"
+    assert "12345678909" not in redigido["text"]["message"]
+    assert "12345678909" not in str(resumo(webhook))
+
+
+def test_cpf_sem_pontuacao_em_texto_livre():
+    assert "12345678909" not in str(resumo("cpf 12345678909", texto_livre=True))
+    assert str(resumo("telefone 11987654321")) == "telefone 11987654321"
+
+
+def test_cpf_pontuado_e_chave_cpf_sao_mascarados():
+    redigido = redigir({"cpfCnpj": "12345678909", "obs": "CPF 123.456.789-09"})
+
+    assert redigido["cpfCnpj"] == "***"
+    assert redigido["obs"] == "CPF ***.***.***-**"
@@ -0,0 +1,46 @@
+import asyncio
+import smtplib
+from email.message import EmailMessage
+
+from app.core.smtp_pool import SMTPPool
+
+
+class ConexaoFalsa:
+    def __init__(self):
+        self.enviadas = []
+
+    def send_message(self, mensagem):
+        if mensagem["To"] == "invalido@example.com":
+            raise smtplib.SMTPRecipientsRefused({mensagem["To"]: (550, b"No such user")})
+        self.enviadas.append(mensagem["To"])
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _mensagem(destinatario):
+    mensagem = EmailMessage()
+    mensagem["To"] = destinatario
+    mensagem.set_content("teste")
+    return mensagem
+
+
+def test_recusa_de_destinatario_reutiliza_conexao():
+    pool = SMTPPool(host="localhost", port=25, usuario="", senha="", workers=1, tamanho_lote=10)
+    conexoes = []
+
+    def conectar():
+        conexoes.append(ConexaoFalsa())
+        return conexoes[-1]
+
+    pool._conectar = conectar
+    destinatarios = ["a@example.com", "invalido@example.com", "b@example.com"]
+    resultados = pool._enviar_lote(0, [_mensagem(d) for d in destinatarios])
+
+    assert resultados == [True, False, True]
+    assert len(conexoes) == 1
+    assert conexoes[0].enviadas == ["a@example.com", "b@example.com"]
+    asyncio.run(pool.parar())
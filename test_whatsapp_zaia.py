@@ -0,0 +1,104 @@
+import asyncio
+
+from app.services import whatsapp_service as modulo
+from app.services.whatsapp_service import WhatsAppService
+
+
+class RespostaFalsa:
+    def __init__(self, dados):
+        self.dados = dados
+        self.status = 200
+
+    async def json(self):
+        return self.dados
+
+    async def text(self):
+        return str(self.dados)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class SessaoZaiaFalsa:
+    def __init__(self, resposta_mensagem, historico=()):
+        self.resposta_mensagem = resposta_mensagem
+        self.historico = list(historico)
+        self.chamadas = []
+
+    def post(self, url, headers=None, json=None):
+        self.chamadas.append(("POST", url, json))
+        if url.endswith("/external-generative-chat/create"):
+            return RespostaFalsa({"id": 42})
+        return RespostaFalsa(self.resposta_mensagem)
+
+    def get(self, url, headers=None, params=None):
+        self.chamadas.append(("GET", url, params))
+        return RespostaFalsa({"externalGenerativeChats": [{"id": 42, "externalGenerativeMessages": self.historico}]})
+
+
+def _preparar(monkeypatch, sessao, chat_existente=None):
+    esperas = []
+
+    async def obter(phone):
+        return chat_existente
+
+    async def salvar(phone, chat_id):
+        pass
+
+    async def aguardar_resposta(chat_id, apos_id=None, apos_total=0, timeout=None):
+        esperas.append((chat_id, apos_id, apos_total))
+        return "resposta do poller"
+
+    monkeypatch.setattr(modulo.http_clients, "session", lambda nome: sessao)
+    monkeypatch.setattr(modulo.zaia_sessions, "obter", obter)
+    monkeypatch.setattr(modulo.zaia_sessions, "salvar", salvar)
+    monkeypatch.setattr(modulo.zaia_poller, "aguardar_resposta", aguardar_resposta)
+    return esperas
+
+
+def test_chat_reutilizado_envia_so_a_mensagem_nova(monkeypatch):
+    sessao = SessaoZaiaFalsa({"id": 7, "origin": "user", "text": "e o boleto?"})
+    _preparar(monkeypatch, sessao, chat_existente=42)
+
+    resposta = asyncio.run(WhatsAppService().process_with_zaia("e o boleto?", phone="5511999999999"))
+
+    assert resposta == ("resposta do poller", False)
+    assert [metodo for metodo, _, _ in sessao.chamadas] == ["POST"]
+    assert sessao.chamadas[0][2]["prompt"] == "e o boleto?"
+
+
+def test_envio_retorna_prompt_do_usuario_aguarda_resposta_mais_nova(monkeypatch):
+    sessao = SessaoZaiaFalsa({"id": 7, "origin": "user", "text": "oi"})
+    esperas = _preparar(monkeypatch, sessao)
+
+    resposta = asyncio.run(WhatsAppService().process_with_zaia("oi", phone="5511999999999"))
+
+    assert resposta == ("resposta do poller", False)
+    assert esperas == [(42, 7, 0)]
+
+
+def test_envio_retorna_resposta_do_assistente(monkeypatch):
+    sessao = SessaoZaiaFalsa({"id": 8, "origin": "assistant", "text": "Olá! Como posso ajudar?"})
+    esperas = _preparar(monkeypatch, sessao)
+
+    resposta = asyncio.run(WhatsAppService().process_with_zaia("oi", phone="5511999999999"))
+
+    assert resposta == ("Olá! Como posso ajudar?", False)
+    assert esperas == []
+
+
+def test_envio_sem_prompt_localiza_o_prompt_no_historico(monkeypatch):
+    historico = [
+        {"id": 5, "origin": "user", "text": "oi"},
+        {"id": 6, "origin": "assistant", "text": "Olá!"},
+        {"id": 7, "origin": "user", "text": "oi"},
+    ]
+    sessao = SessaoZaiaFalsa({"id": 8, "origin": "assistant", "text": ""}, historico)
+    esperas = _preparar(monkeypatch, sessao, chat_existente=42)
+
+    asyncio.run(WhatsAppService().process_with_zaia("oi", phone="5511999999999"))
+
+    assert esperas == [(42, 7, 3)]